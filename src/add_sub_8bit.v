@@ -1,4 +1,11 @@
-module add_sub_8bit (
+// Adder architecture, selectable at elaboration with -DADDER_ARCH=<n> (make ADDER_ARCH=<n>) or the ADDER_ARCH parameter //
+`ifndef ADDER_ARCH
+`define ADDER_ARCH 0
+`endif
+
+module add_sub_8bit #(
+    parameter ADDER_ARCH = `ADDER_ARCH  // 0 = ripple carry, 1 = carry-lookahead (two 4 bit groups), 2 = Kogge-Stone
+) (
     input  wire [7:0] op_a,       // Operand A (8 bits)
     input  wire [7:0] op_b,       // Operand B (8 bits)
     input  wire       sub,        // Addition/Subtraction if 0/1
@@ -7,16 +14,27 @@ module add_sub_8bit (
     output wire       res_zero    // Result is zero
 );
 
+  localparam ADDER_RIPPLE = 0;
+  localparam ADDER_CLA = 1;
+  localparam ADDER_KOGGE_STONE = 2;
+
   genvar i;                               // Will be used to generate circuitry for bits 7-0
+  genvar level;                           // Prefix tree level (Kogge-Stone)
 
   // Internal signals //
   wire [7:0] b_xor_sub;                   // Signal for taking 2s complement of Operand B
+  /* verilator lint_off UNOPTFLAT */    // Each carry bit only depends on lower ones, Verilator sees the vector as one loop
   wire [8:0] carry_array;                 // Signal for storing the initial carry in and generated carry out
-  
+  /* verilator lint_on UNOPTFLAT */
+  wire [8:1] ripple_carry;                // Carry out of each full adder, only used by the ripple architecture
+  wire [7:0] p = op_a ^ b_xor_sub;        // Propagate (bit i)
+  wire [7:0] g = op_a & b_xor_sub;        // Generate (bit i)
+
   // Generate initial carry in //
   assign carry_array[0] = sub;            // Add 1 to perform 2s complement of Operand B if needed
-  
+
   // Generate circuitry for bits 7-0 //
+  // Every architecture keeps these full adders (genblk1[i].fa) for the sum bits, only where their carry in comes from changes
   generate
   for (i = 0; i < 8; i = i + 1) begin     // Generate circuitry for bits 7-0
     assign b_xor_sub[i] = op_b[i] ^ sub;  // Invert the bits of operand B if sub is 1, otherwise keep operand B the same
@@ -26,13 +44,61 @@ module add_sub_8bit (
         .b(b_xor_sub[i]),                 // Operand B (bit i) (1 bit)
         .cin(carry_array[i]),             // Carry in (bit i) (1 bit)
         .sum(sum[i]),                     // Sum (bit i) (1 bit)
-        .cout(carry_array[i+1])           // Carry out (bit i+1) (1 bit)
-      ); 
+        .cout(ripple_carry[i+1])          // Carry out (bit i+1) (1 bit)
+      );
+  end
+  endgenerate
+
+  // Carries 8-1 //
+  generate
+  if (ADDER_ARCH == ADDER_CLA) begin : cla
+    // Two 4 bit carry-lookahead groups, the carries inside a group only depend on the group's carry in
+    wire [1:0] group_g;                   // Group generate
+    wire [1:0] group_p;                   // Group propagate
+    for (i = 0; i < 2; i = i + 1) begin : group
+      wire [3:0] gg = g[4*i+3:4*i];
+      wire [3:0] pp = p[4*i+3:4*i];
+      wire c0 = carry_array[4*i];
+      assign carry_array[4*i+1] = gg[0] | (pp[0] & c0);
+      assign carry_array[4*i+2] = gg[1] | (pp[1] & gg[0]) | (pp[1] & pp[0] & c0);
+      assign carry_array[4*i+3] = gg[2] | (pp[2] & gg[1]) | (pp[2] & pp[1] & gg[0]) | (pp[2] & pp[1] & pp[0] & c0);
+      assign group_g[i] = gg[3] | (pp[3] & gg[2]) | (pp[3] & pp[2] & gg[1]) | (pp[3] & pp[2] & pp[1] & gg[0]);
+      assign group_p[i] = &pp;
+    end
+    // Carries into and out of the upper group, from the group terms
+    assign carry_array[4] = group_g[0] | (group_p[0] & carry_array[0]);
+    assign carry_array[8] = group_g[1] | (group_p[1] & group_g[0]) | (group_p[1] & group_p[0] & carry_array[0]);
+  end
+  else if (ADDER_ARCH == ADDER_KOGGE_STONE) begin : kogge_stone
+    // Parallel prefix over (g, p) in log2(8) = 3 levels, the carry in is folded into bit 0's generate.
+    // Level n of the tree is bits 8n+7 to 8n of prefix_g/prefix_p
+    /* verilator lint_off UNOPTFLAT */  // Each level only reads the one below, Verilator sees each vector as one loop
+    wire [31:0] prefix_g;
+    wire [31:0] prefix_p;
+    /* verilator lint_on UNOPTFLAT */
+    assign prefix_g[7:0] = {g[7:1], g[0] | (p[0] & carry_array[0])};
+    assign prefix_p[7:0] = p;
+    for (level = 0; level < 3; level = level + 1) begin : prefix
+      for (i = 0; i < 8; i = i + 1) begin : node
+        if (i >= (1 << level)) begin : combine
+          assign prefix_g[8*level+8+i] = prefix_g[8*level+i] | (prefix_p[8*level+i] & prefix_g[8*level+i-(1 << level)]);
+          assign prefix_p[8*level+8+i] = prefix_p[8*level+i] & prefix_p[8*level+i-(1 << level)];
+        end
+        else begin : pass
+          assign prefix_g[8*level+8+i] = prefix_g[8*level+i];
+          assign prefix_p[8*level+8+i] = prefix_p[8*level+i];
+        end
+      end
+    end
+    assign carry_array[8:1] = prefix_g[31:24];  // Bit i generates (with the carry in) out of bits i-0
+  end
+  else begin : ripple
+    assign carry_array[8:1] = ripple_carry;
   end
   endgenerate
-  
+
   // Generate flags //
   assign carry_out = carry_array[8];      // Set carry out to be the last value of the array of the carries
   assign res_zero = ~|sum;                // Reduce the sum signal with NOR to detect if any of the bits were 1
-  
-endmodule
\ No newline at end of file
+
+endmodule
@@ -6,14 +6,16 @@
 `default_nettype none
 
 module control_block (
-    output wire clk,
+    input wire clk,
     input wire resetn,
     input wire [3:0] opcode,
     output wire [14: 0] out,    
 
     // Inputs for the programmer part
     input wire programming,
+    input wire burst,           // Burst programming, one byte per clock (only with programming)
     output wire done_load,
+    output wire burst_load,
     output wire read_ui_in,
     output wire ready,
     output wire HF
@@ -49,23 +51,62 @@ localparam SIG_OUT_LOAD_N = 0;          // \L_O
 
 /* Internal Regs */
 reg [2:0] stage;
-reg [16:0] control_signals; // a 15 bit wide register
+reg [14:0] control_signals; // a 15 bit wide register
 reg hlt_flag;
 reg done_load_reg;
 reg read_ui_in_reg;
 reg ready_reg;
+reg burst_load_reg;
+reg burst_stage;            // The stage just finished was a burst T0/T3
 /* Micro-Operation Stages */
 parameter T0 = 0, T1 = 1, T2 = 2, T3 = 3, T4 = 4, T5 = 5; 
 
+/* Last Micro-Operation Stage of the current opcode, the next stage is T0 */
+// NOP, OUT, JMP and HLT are done in T3, LDA in T4. STA writes the RAM in T5, so it runs the full sequence like ADD/SUB.
+// Programming always runs T0 to T5 (the IR is not loaded, so the opcode means nothing there)
+wire [2:0] last_stage = programming ? T5 :
+                        (opcode == OP_ADD || opcode == OP_SUB || opcode == OP_STA) ? T5 :
+                        (opcode == OP_LDA) ? T4 : T3;
+
+/* Prefetch: overlap the next instruction's T0 and T1 with the last Micro-Operation Stage */
+// Only NOP (T3, nothing asserted) and STA (T5, RAM write from the MAR) leave the bus, the PC and the MAR address
+// free in their last stage. That stage also does Ep, nLma and Cp, and the next instruction starts at T2.
+// STA to the address being fetched: the RAM write uses the MAR address from before the edge that loads the PC
+// into the MAR, and the RAM is only read for the fetch in T2, a cycle after the write, so no stall is needed
+wire nop_opcode = !(opcode == OP_HLT || opcode == OP_ADD || opcode == OP_SUB || opcode == OP_LDA ||
+                    opcode == OP_OUT || opcode == OP_STA || opcode == OP_JMP);
+
+/* Burst programming: T0 loads the start address (the PC) into the MAR, then T3 repeats while burst is held */
+// Every T3 writes ui_in straight into RAM[MAR] and increments the MAR address (burst_load) and the PC, so one byte
+// goes in per clock and the PC keeps pointing at the next free address. When burst is dropped the next stage is T0,
+// so a handshake (programming still held) continues at that address
+wire burst_mode = programming && burst;
+wire burst_end = burst_stage && !burst_mode;    // First stage after the burst, idle until the T0 that follows
+
+wire prefetch = !programming && !burst_end && ((stage == T3 && nop_opcode) || (stage == T5 && opcode == OP_STA));
+
 /* Stage Transition Logic  - THIS PART IS CORRECT, NOTHING IS WRONG IN HERE */
 always @(posedge clk) begin
     if (!resetn) begin           // Check if reset is asserted, if yes, put into a holding stage
       stage <= 6;
+      burst_stage <= 0;
     end
  	else begin                   // If reset is not asserted, do the stages sequentially
-      if (stage == 6) begin        
+      if (stage == 6) begin        // Only used to leave reset
           stage <= 0;
         end 
+        else if (burst_mode && (stage == T0 || stage == T3)) begin
+            // Burst programming, skip T1/T2 and stay in T3
+            stage <= T3;
+        end
+        else if (burst_end) begin
+            // Burst dropped, start over from the PC
+            stage <= T0;
+        end
+        else if (stage == last_stage && !hlt_flag) begin
+            // Instruction finished, fetch the next one (from T2 if this stage already did T0 and T1)
+            stage <= prefetch ? T2 : T0;
+        end
         else if ((stage == T0 || stage == T1 || 
                  stage == T2 || stage == T3 || 
             stage == T4 || stage == T5) && !hlt_flag) begin
@@ -77,6 +118,9 @@ always @(posedge clk) begin
             stage <= 6; // Set to stage 6 
         end
     end
+    if (resetn) begin
+        burst_stage <= burst_mode && (stage == T0 || stage == T3);
+    end
     if (hlt_flag) begin
         stage <= 7;
     end
@@ -85,96 +129,112 @@ end
 
 // What is the difference between <= and = ...????
 /* Micro-Operation Logic */
+// The outputs for the stage are worked out in the next_* variables with blocking assignments and then
+// registered once at the end, so no reg mixes = and <= (Verilator rejects that, BLKANDNBLK)
+reg [14:0] next_control_signals;
+reg next_done_load;
+reg next_read_ui_in;
+reg next_ready;
+reg next_burst_load;
+
 always @(negedge clk) begin
-    control_signals = 15'b000111111100011; // All signals are deasserted
-    done_load_reg = 0;
-    read_ui_in_reg = 0;
-    ready_reg = 0;
+    next_control_signals = 15'b000111111100011; // All signals are deasserted
+    next_done_load = 0;
+    next_read_ui_in = 0;
+    next_ready = 0;
+    next_burst_load = 0;
     if (!resetn) begin           // Check if reset is asserted, if yes, init halt reg
       hlt_flag <= 0;
     end
     
     case(stage)
         T0: begin
-            control_signals[SIG_PC_EN] <= 1;
-            control_signals[SIG_MAR_ADDR_LOAD_N] <= 0;
-            ready_reg <= 1;
+            next_control_signals[SIG_PC_EN] = 1;
+            next_control_signals[SIG_MAR_ADDR_LOAD_N] = 0;
+            next_ready = 1;
         end 
         T1: begin
-            control_signals[SIG_PC_INC] <= 1;
+            next_control_signals[SIG_PC_INC] = 1;
             
         end
         T2: begin
             if (!programming) begin
-                control_signals[SIG_RAM_EN_N] <= 0;
-                control_signals[SIG_IR_LOAD_N] <= 0;
+                next_control_signals[SIG_RAM_EN_N] = 0;
+                next_control_signals[SIG_IR_LOAD_N] = 0;
             end
         end
         T3: begin
             if (opcode == OP_HLT) begin
                 hlt_flag <= 1;
             end
-            if (!programming) begin
+            if (burst_end) begin
+                // Do nothing (leave control_signals unchanged)
+            end else if (!programming) begin
                 case (opcode)
                     OP_ADD, OP_SUB, OP_LDA, OP_STA: begin
-                        control_signals[SIG_IR_EN_N] <= 0;
-                        control_signals[SIG_MAR_ADDR_LOAD_N] <= 0;
+                        next_control_signals[SIG_IR_EN_N] = 0;
+                        next_control_signals[SIG_MAR_ADDR_LOAD_N] = 0;
                     end
                     OP_OUT: begin
-                        control_signals[SIG_REGA_EN] <= 1;
-                        control_signals[SIG_OUT_LOAD_N] <= 0;
+                        next_control_signals[SIG_REGA_EN] = 1;
+                        next_control_signals[SIG_OUT_LOAD_N] = 0;
                     end
                     OP_JMP: begin
-                        control_signals[SIG_IR_EN_N] <= 0;
-                        control_signals[SIG_PC_LOAD] <= 1;
+                        next_control_signals[SIG_IR_EN_N] = 0;
+                        next_control_signals[SIG_PC_LOAD] = 1;
                     end
                     default: begin
                     // Do nothing (leave control_signals unchanged)
                     end
                 endcase
+            end else if (burst) begin
+                next_control_signals[SIG_RAM_LOAD_N] = 0;
+                next_control_signals[SIG_PC_INC] = 1;
+                next_done_load = 1;
+                next_burst_load = 1;
             end else begin
-                read_ui_in_reg <= 1;
-                control_signals[SIG_MAR_MEM_LOAD_N] <= 0;
+                next_read_ui_in = 1;
+                next_control_signals[SIG_MAR_MEM_LOAD_N] = 0;
             end
         end
         T4: begin
             if (!programming) begin
                 case (opcode)
                     OP_ADD, OP_SUB: begin
-                        control_signals[SIG_RAM_EN_N] <= 0;
-                        control_signals[SIG_REGB_LOAD_N] <= 0;
+                        next_control_signals[SIG_RAM_EN_N] = 0;
+                        next_control_signals[SIG_REGB_LOAD_N] = 0;
                     end
                     OP_LDA: begin
-                        control_signals[SIG_RAM_EN_N] <= 0;
-                        control_signals[SIG_REGA_LOAD_N] <= 0;
+                        next_control_signals[SIG_RAM_EN_N] = 0;
+                        next_control_signals[SIG_REGA_LOAD_N] = 0;
                     end
                     OP_STA: begin
-                        control_signals[SIG_REGA_EN] <= 1;
-                        control_signals[SIG_MAR_MEM_LOAD_N] <= 0;
+                        next_control_signals[SIG_REGA_EN] = 1;
+                        next_control_signals[SIG_MAR_MEM_LOAD_N] = 0;
                     end
                     default: begin
                     // Do nothing (leave control_signals unchanged)
                     end
                 endcase
             end else begin
-                control_signals[SIG_RAM_LOAD_N] <= 0;
-                done_load_reg <= 1;
+                next_control_signals[SIG_RAM_LOAD_N] = 0;
+                next_done_load = 1;
             end
         end
         T5: begin
             if (!programming) begin
                 case (opcode)
                     OP_ADD: begin
-                        control_signals[SIG_REGB_EN] <= 1;
-                        control_signals[SIG_REGA_LOAD_N] <= 0;
+                        next_control_signals[SIG_REGB_EN] = 1;
+                        next_control_signals[SIG_REGA_LOAD_N] = 0;
                     end
                     OP_SUB: begin
-                        control_signals[SIG_ADDER_SUB] <= 1;
-                        control_signals[SIG_REGB_EN] <= 1;
-                        control_signals[SIG_REGA_LOAD_N] <= 0;
+                        next_control_signals[SIG_ADDER_SUB] = 1;
+                        next_control_signals[SIG_REGB_EN] = 1;
+                        next_control_signals[SIG_REGA_LOAD_N] = 0;
                     end
                     OP_STA: begin
-                        control_signals[SIG_RAM_LOAD_N] <= 0;
+                        next_control_signals[SIG_RAM_LOAD_N] = 0;
                     end
                     default: begin
                     // Do nothing (leave control_signals unchanged)
@@ -186,12 +246,23 @@ always @(negedge clk) begin
         // Do nothing (leave control_signals unchanged)
         end
     endcase
+    if (prefetch) begin
+        next_control_signals[SIG_PC_EN] = 1;
+        next_control_signals[SIG_MAR_ADDR_LOAD_N] = 0;
+        next_control_signals[SIG_PC_INC] = 1;
+    end
+    control_signals <= next_control_signals;
+    done_load_reg <= next_done_load;
+    read_ui_in_reg <= next_read_ui_in;
+    ready_reg <= next_ready;
+    burst_load_reg <= next_burst_load;
 end
 
 assign out = control_signals;
 assign done_load = done_load_reg;
 assign read_ui_in = read_ui_in_reg;
-assign ready = read_ui_in_reg;
+assign burst_load = burst_load_reg;
+assign ready = ready_reg | burst_load_reg;          // T0 of the handshake, every burst write
 assign HF = hlt_flag;
 
 endmodule
@@ -13,13 +13,14 @@ module tt_um_dff_mem #(
 );
 
   reg [7:0] RAM[RAM_BYTES - 1:0];
+  integer i;
 
   // Assign outputs based on ce_n and lr_n control signals
   assign data_out = (!ce_n) ? RAM[addr] : 8'bZ;  // Output data when ce_n is low
 
   always @(posedge clk) begin
     if (!rst_n) begin
-      for (int i = 0; i < RAM_BYTES; i++) begin
+      for (i = 0; i < RAM_BYTES; i = i + 1) begin
         RAM[i] <= 8'b0;  // Reset RAM contents
       end
     end else begin
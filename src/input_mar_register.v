@@ -1,5 +1,6 @@
 module input_mar_register(
   input clk, n_load_data, n_load_addr,
+  input inc_addr,   // Burst programming, step to the next address (ACTIVE-HIGH)
   input [7:0] bus,
   output reg [7:0] data,
   output reg [3:0] addr
@@ -8,5 +9,6 @@ module input_mar_register(
   always@(posedge clk) begin
     if(!n_load_data) data <= bus;
     if(!n_load_addr) addr <= bus[3:0];
+    else if(inc_addr) addr <= addr + 1;
   end
 endmodule
\ No newline at end of file
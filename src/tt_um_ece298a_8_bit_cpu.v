@@ -5,13 +5,13 @@
 `default_nettype none
 
 module tt_um_ece298a_8_bit_cpu_top (
-    input  wire [7:0] ui_in        // Dedicated inputs
-    output wire [7:0] uo_out       // Dedicated outputs
-    input  wire [7:0] uio_in       // IOs: Input path
-    output wire [7:0] uio_out      // IOs: Output path
-    output wire [7:0] uio_oe       // IOs: Enable path (active high: 0=input, 1=output)
-    input  wire       ena          // always 1 when the design is powered, so you can ignore it
-    input  wire       clk          // clock
+    input  wire [7:0] ui_in,       // Dedicated inputs
+    output wire [7:0] uo_out,      // Dedicated outputs
+    input  wire [7:0] uio_in,      // IOs: Input path
+    output wire [7:0] uio_out,     // IOs: Output path
+    output wire [7:0] uio_oe,      // IOs: Enable path (active high: 0=input, 1=output)
+    input  wire       ena,         // always 1 when the design is powered, so you can ignore it
+    input  wire       clk,         // clock
     input  wire       rst_n         // reset_n - low to reset
 );
     // Bus //
@@ -26,6 +26,8 @@ module tt_um_ece298a_8_bit_cpu_top (
     wire ready_for_ui;              // Ready signal for UI (ACTIVE-HIGH)
     wire done_load;                 // Done loading signal (ACTIVE-HIGH)
     wire read_ui_in;                // Read UI input signal (ACTIVE-HIGH)    
+    wire burst;                     // Burst programming mode signal (ACTIVE-HIGH)
+    wire burst_load;                // Burst write of ui_in into the RAM signal (ACTIVE-HIGH)
 
     // Wires //
     wire [3:0] opcode;                  // opcode from IR to Control
@@ -40,6 +42,7 @@ module tt_um_ece298a_8_bit_cpu_top (
     // Wire between MAR and RAM //
     wire [7:0] mar_to_ram_data;         // MAR to RAM data wire
     wire [3:0] mar_to_ram_addr;         // MAR to RAM address wire
+    wire [7:0] ram_data_in = burst_load ? ui_in : mar_to_ram_data;     // Burst programming writes ui_in straight into the RAM
 
     // Control Signals for the Program Counter //
     wire Cp = control_signals[14];                  // allow the Program Counter to increment (ACTIVE-HIGH)
@@ -102,7 +105,9 @@ module tt_um_ece298a_8_bit_cpu_top (
         .opcode(opcode[3:0]),           // Opcode from the Instruction Register
         .out(control_signals[14:0]),    // Control Signals
         .programming(programming),      // Programming mode signal (ACTIVE-HIGH)
+        .burst(burst),                  // Burst programming mode signal (ACTIVE-HIGH)
         .done_load(done_load),          // Done loading signal (ACTIVE-HIGH)
+        .burst_load(burst_load),        // Burst write of ui_in into the RAM signal (ACTIVE-HIGH)
         .read_ui_in(read_ui_in),        // Read UI input signal (ACTIVE-HIGH)
         .ready(ready_for_ui),           // Ready signal for UI (ACTIVE-HIGH)
         .HF(HF)                         // Halt Flag (ACTIVE-HIGH)
@@ -138,6 +143,7 @@ module tt_um_ece298a_8_bit_cpu_top (
         .clk(clk),              // Clock (Rising edge)
         .n_load_data(nLmd),     // Enable loading of the MAR data from the bus (ACTIVE-LOW)
         .n_load_addr(nLma),     // Enable loading of the MAR address from the bus (ACTIVE-LOW)
+        .inc_addr(burst_load),  // Increment the MAR address after every burst write (ACTIVE-HIGH)
         .bus(bus),              // Bus (8 bits)
         .data(mar_to_ram_data), // MAR to RAM data wire
         .addr(mar_to_ram_addr)  // MAR to RAM address wire
@@ -174,7 +180,7 @@ module tt_um_ece298a_8_bit_cpu_top (
     .RAM_BYTES(16)                  // Set the RAM size to 16 bytes
     ) ram (
         .addr(mar_to_ram_addr),     // MAR to RAM address wire
-        .data_in(mar_to_ram_data),  // MAR to RAM data wire
+        .data_in(ram_data_in),      // MAR to RAM data wire, ui_in during burst programming
         .data_out(bus),             // Bus (8 bits)
         .lr_n(nLr),                 // enable the RAM load from the bus (ACTIVE-LOW)
         .ce_n(nCE),                 // enable the RAM output to the bus (ACTIVE-LOW)
@@ -182,6 +188,7 @@ module tt_um_ece298a_8_bit_cpu_top (
         .rst_n(1'b1)                // Reset (ACTIVE-LOW) (Never reset the RAM)
     );
     assign programming = uio_in[0];     // Programming mode signal (ACTIVE-HIGH) to the UIO input 0
+    assign burst = uio_in[6];           // Burst programming mode signal (ACTIVE-HIGH) to the UIO input 6
     assign uio_out[1] = ready_for_ui;   // Ready signal for UI (ACTIVE-HIGH) to the UIO output 1
     assign uio_out[2] = done_load;      // Done loading signal (ACTIVE-HIGH) to the UIO output 2
     assign uio_out[3] = CF;             // Carry Flag (ALU) (ACTIVE-HIGH) to the UIO output 3
@@ -194,6 +201,6 @@ module tt_um_ece298a_8_bit_cpu_top (
     assign uio_out[0] = 1'b0;           // Set the IO outputs to 0
     assign uio_oe = 8'b00111110;        // Configure the IO ports [5:1] as outputs and [0], [6],[7] as input
 
-    wire _unused = &{uio_in[7:6], ena}; // Avoid unused variable warning
+    wire _unused = &{uio_in[7], ena};   // Avoid unused variable warning
 
 endmodule
@@ -0,0 +1,75 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+# Simulator throughput: runs one test under each simulator and reports simulated clock cycles per wall clock second,
+# from the sim_time_ns and time attributes cocotb writes for the testcase in results.xml.
+#
+#   python bench_sim.py                                      # memory_load_and_verify_outputs, icarus vs verilator
+#   python bench_sim.py -k random_program_regression -- FUZZ_PROGRAMS=2000
+#   python bench_sim.py -s icarus --hdl-clock -k clock_benchmark -- CLOCK_BENCH_CYCLES=100000
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def run(label, sim, extra, args):
+    # Returns (build + startup seconds, test seconds, simulated ns), or None if the test did not report
+    build = os.path.join(TEST_DIR, "sim_build", "bench", sim)
+    os.makedirs(build, exist_ok=True)
+    results = os.path.join(build, f"results_{label}.xml")
+    if os.path.exists(results):
+        os.remove(results)
+    command = ["make", "-f", args.makefile, f"SIM={sim}", f"SIM_BUILD={build}", f"TESTCASE={args.test}",
+               f"COCOTB_RESULTS_FILE={results}"] + extra + args.make_args
+    start = time.perf_counter()
+    with open(os.path.join(build, f"sim_{label}.log"), "w") as log_file:
+        subprocess.call(command, cwd=TEST_DIR, stdout=log_file, stderr=subprocess.STDOUT)
+    total = time.perf_counter() - start
+    if not os.path.exists(results):
+        return None
+    case = ET.parse(results).getroot().find(f".//testcase[@name='{args.test}']")
+    if case is None or case.find("failure") is not None:
+        return None
+    seconds = float(case.get("time"))
+    return total - seconds, seconds, float(case.get("sim_time_ns"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare simulated cycles per second between simulators")
+    parser.add_argument("-f", "--makefile", default="Makefile")
+    parser.add_argument("-k", "--test", default="memory_load_and_verify_outputs")
+    parser.add_argument("-s", "--sims", default="icarus,verilator", help="comma separated SIM values")
+    parser.add_argument("--period", type=int, default=10, help="clock period in ns (CLOCK_PERIOD in test.py)")
+    parser.add_argument("--hdl-clock", action="store_true", help="also run every simulator with the clock generated in tb.v")
+    parser.add_argument("make_args", nargs="*", help="extra make variables (put them after --)")
+    args = parser.parse_args()
+
+    variants = []
+    for sim in args.sims.split(","):
+        variants.append((sim, sim, []))
+        if args.hdl_clock:
+            variants.append((f"{sim}+hdlclk", sim, [f"HDL_CLOCK_PERIOD={args.period}"]))
+
+    print(f"{args.test}, {args.period} ns clock")
+    print(f"  {'run':<16} {'build+start s':>13} {'test s':>9} {'cycles':>10} {'cycles/s':>11}")
+    rates = {}
+    for label, sim, extra in variants:
+        result = run(label, sim, extra, args)
+        if result is None:
+            print(f"  {label:<16} failed, see sim_build/bench/{sim}/sim_{label}.log")
+            continue
+        overhead, seconds, sim_ns = result
+        cycles = sim_ns / args.period
+        rates[label] = cycles / seconds if seconds else 0
+        print(f"  {label:<16} {overhead:13.2f} {seconds:9.2f} {cycles:10.0f} {rates[label]:11.0f}")
+    baseline = next(iter(rates.values()), 0)
+    for label, rate in list(rates.items())[1:] if baseline else []:
+        print(f"  {label} is {rate / baseline:.2f}x {next(iter(rates))}")
+    return 0 if len(rates) == len(variants) else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
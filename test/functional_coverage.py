@@ -0,0 +1,139 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+# Functional coverage for the cocotb benches.
+# Every bin is one bit in a preallocated array('Q'), so sampling is an index computation and one OR.
+# Each simulation writes its groups to a JSON file when it exits, files from several runs can be merged:
+#   python functional_coverage.py merge sim_build/*/coverage/*.json -o merged.json
+#   python functional_coverage.py holes sim_build/*/coverage/*.json
+
+import argparse
+import atexit
+import json
+import os
+from array import array
+from itertools import product
+
+class CoverGroup:
+    # axes is a list of (name, bin labels), the first axis is the most significant digit of the bin index.
+    # ignore(*positions) marks bins that cannot be reached, they are left out of the goal and the holes
+    def __init__(self, name, axes, ignore=None):
+        self.name = name
+        self.axes = [(axis, [str(label) for label in labels]) for axis, labels in axes]
+        self.size = 1
+        for _, labels in self.axes:
+            self.size *= len(labels)
+        words = (self.size + 63) >> 6
+        self.bits = array('Q', bytes(8 * words))
+        self.ignored = array('Q', bytes(8 * words))
+        if ignore is not None:
+            for index, positions in enumerate(product(*(range(len(labels)) for _, labels in self.axes))):
+                if ignore(*positions):
+                    self.ignored[index >> 6] |= 1 << (index & 63)
+
+    def index(self, *positions):
+        # Mixed radix index, the hot paths inline this with shifts when every axis is a power of two
+        index = 0
+        for (_, labels), position in zip(self.axes, positions):
+            index = index * len(labels) + position
+        return index
+
+    def hit(self, index):
+        self.bits[index >> 6] |= 1 << (index & 63)
+
+    def is_hit(self, index):
+        return (self.bits[index >> 6] >> (index & 63)) & 1
+
+    def goal(self):
+        return self.size - sum(bin(word).count("1") for word in self.ignored)
+
+    def covered(self):
+        return sum(bin(word & ~ignored).count("1") for word, ignored in zip(self.bits, self.ignored))
+
+    def labels(self, index):
+        positions = []
+        for _, labels in reversed(self.axes):
+            index, position = divmod(index, len(labels))
+            positions.append(labels[position])
+        return tuple(reversed(positions))
+
+    def holes(self):
+        # Label tuples of every reachable bin that was never hit
+        return [self.labels(index) for index in range(self.size)
+                if not ((self.bits[index >> 6] | self.ignored[index >> 6]) >> (index & 63)) & 1]
+
+    def merge(self, other):
+        assert self.axes == other.axes, f"Cannot merge coverage group {self.name}, the bins differ"
+        for i, word in enumerate(other.bits):
+            self.bits[i] |= word
+        return self
+
+    def summary(self):
+        goal = self.goal()
+        covered = self.covered()
+        return f"{self.name}: {covered}/{goal} bins ({100 * covered / goal if goal else 100:.1f}%)"
+
+    def to_json(self):
+        return {"name": self.name, "axes": self.axes, "bits": list(self.bits), "ignored": list(self.ignored)}
+
+    @classmethod
+    def from_json(cls, data):
+        group = cls(data["name"], data["axes"])
+        group.bits = array('Q', data["bits"])
+        group.ignored = array('Q', data["ignored"])
+        return group
+
+# Every group created in this process, written out together by write_run_file()
+COVER_GROUPS = {}
+
+def cover_group(name, axes, ignore=None):
+    if name not in COVER_GROUPS:
+        COVER_GROUPS[name] = CoverGroup(name, axes, ignore)
+    return COVER_GROUPS[name]
+
+def run_file_path(module, seed):
+    # One file per simulation next to the sim build, so parallel runs never write the same file
+    directory = os.environ.get("COVERAGE_DIR", os.path.join(os.environ.get("SIM_BUILD", "sim_build"), "coverage"))
+    return os.path.join(directory, f"{module}-{seed}-{os.getpid()}.json")
+
+def write_run_file(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as run_file:
+        json.dump([group.to_json() for group in COVER_GROUPS.values()], run_file)
+
+def write_at_exit(module, seed):
+    # The cocotb regression has no end-of-module hook, the interpreter exit at the end of the simulation is the next best thing
+    atexit.register(write_run_file, run_file_path(module, seed))
+
+def load_and_merge(paths):
+    merged = {}
+    for path in paths:
+        with open(path) as run_file:
+            for data in json.load(run_file):
+                group = CoverGroup.from_json(data)
+                if group.name in merged:
+                    merged[group.name].merge(group)
+                else:
+                    merged[group.name] = group
+    return merged
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge functional coverage run files and list holes")
+    parser.add_argument("command", choices=("merge", "holes"))
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("-o", "--output", help="merged file to write (merge)")
+    args = parser.parse_args()
+
+    merged = load_and_merge(args.files)
+    for group in merged.values():
+        print(group.summary())
+        if args.command == "holes":
+            axis_names = ", ".join(axis for axis, _ in group.axes)
+            for hole in group.holes():
+                print(f"    hole ({axis_names}) = ({', '.join(hole)})")
+    if args.output:
+        with open(args.output, "w") as merged_file:
+            json.dump([group.to_json() for group in merged.values()], merged_file)
+
+if __name__ == "__main__":
+    main()
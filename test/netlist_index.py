@@ -0,0 +1,123 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+# Index of the gate level netlist: which net carries each bit of the signals test.py probes in GL runs.
+# The netlist is parsed once, every bit is looked up in a list of candidate names (the RTL name first, then the
+# names synthesis is known to leave behind), and the result goes to a JSON file next to the sim build that
+# ProbeRegistry in test.py loads. The Makefile rebuilds it when gate_level_netlist.v changes.
+#
+#   python netlist_index.py gate_level_netlist.v -o sim_build/gl/netlist_index.json
+#   python netlist_index.py gate_level_netlist.v --show        # print the index, list bits without a net
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+
+# Candidate net names for every bit, LSB first, without the leading backslash of escaped identifiers.
+# A candidate "a.b[3]" matches a scalar net \a.b[3] or bit 3 of a vector net \a.b
+def _bits(width, *formats):
+    return [[fmt.format(i=i) for fmt in formats] for i in range(width)]
+
+CONTROL_ALIASES = {
+    1: ["b_register.n_load"],                       # nLb, the flop is merged with the B register enable
+    3: ["alu_object.addsub.genblk1[0].fa.cin"],     # sub, it is the carry in of bit 0
+    5: ["accumulator_object.load"],                 # nLa
+}
+
+PROBE_CANDIDATES = {
+    'control_signals': [["cb.control_signals[{}]".format(i), "control_signals[{}]".format(i)] + CONTROL_ALIASES.get(i, [])
+                        for i in range(15)],
+    'regA': _bits(8, "accumulator_object.regA[{i}]", "reg_a[{i}]", "alu_object.addsub.genblk1[{i}].fa.a"),
+    'regB': _bits(8, "b_register.value[{i}]", "reg_b[{i}]", "alu_object.addsub.op_b[{i}]"),
+    'bus': _bits(8, "bus[{i}]", "accumulator_object.bus[{i}]"),
+    'pc': _bits(4, "pc.counter[{i}]", "pc.set_bit_{i}.S"),
+    'stage': _bits(3, "cb.stage[{i}]"),
+    'mar_addr': _bits(4, "input_mar_register.addr[{i}]"),
+    'mar_data': _bits(8, "input_mar_register.data[{i}]"),
+    'opcode': [["instruction_register.instruction[{}]".format(i + 4), "opcode[{}]".format(i)] for i in range(4)],
+    'ram': [["ram.RAM[{}][{}]".format(i, j)] for i in range(16) for j in range(8)],     # RAM[i] bit j is entry i*8+j
+}
+
+MODULE = re.compile(r"^\s*module\s+(\S+)")
+# wire/input/output/inout declarations, one name each as written by the PnR tools (escaped names end at whitespace)
+DECLARATION = re.compile(r"^\s*(?:wire|input|output|inout)\s+(?:\[(\d+):(\d+)\]\s*)?(\\\S+|[A-Za-z_][\w$]*)\s*;")
+
+def parse_nets(path, top=None):
+    # {name without backslash: (declared name, msb, lsb)} of the top module, msb/lsb are None for scalars.
+    # The top module is `top`, or the tt_um_* module, or the last module in the file
+    modules = {}
+    current = None
+    with open(path) as netlist:
+        for line in netlist:
+            match = DECLARATION.match(line)
+            if match and current is not None:
+                msb, lsb, name = match.groups()
+                modules[current][name.lstrip("\\")] = (name, None if msb is None else int(msb), None if lsb is None else int(lsb))
+                continue
+            match = MODULE.match(line)
+            if match:
+                current = match.group(1).split("(")[0]
+                modules[current] = {}
+    if top is None:
+        tiny = [name for name in modules if name.startswith("tt_um_")]
+        top = tiny[0] if tiny else (list(modules)[-1] if modules else None)
+    assert top in modules, f"Module {top} not found in {path}"
+    return top, modules[top]
+
+def lookup(nets, candidate):
+    # [net name for _id, bit index or None] or None
+    if candidate in nets:
+        name, msb, _ = nets[candidate]
+        return [name, None] if msb is None else [name, 0]
+    match = re.match(r"^(.*)\[(\d+)\]$", candidate)
+    if match and match.group(1) in nets:
+        name, msb, lsb = nets[match.group(1)]
+        index = int(match.group(2))
+        if msb is not None and min(msb, lsb) <= index <= max(msb, lsb):
+            return [name, index]
+    return None
+
+def build_index(path, top=None):
+    top, nets = parse_nets(path, top)
+    signals = {}
+    missing = {}
+    for signal, bits in PROBE_CANDIDATES.items():
+        found = []
+        for bit, candidates in enumerate(bits):
+            entry = next((net for net in (lookup(nets, candidate) for candidate in candidates) if net), None)
+            found.append(entry)
+            if entry is None:
+                missing.setdefault(signal, []).append(bit)
+        signals[signal] = found
+    with open(path, "rb") as netlist:
+        digest = hashlib.sha256(netlist.read()).hexdigest()
+    return {"netlist": os.path.abspath(path), "sha256": digest, "top": top, "nets": len(nets), "signals": signals, "missing": missing}
+
+def main():
+    parser = argparse.ArgumentParser(description="Map the probed CPU signals to gate level netlist nets")
+    parser.add_argument("netlist")
+    parser.add_argument("-o", "--output", help="JSON index to write")
+    parser.add_argument("--top", help="module to index (default: the tt_um_* module)")
+    parser.add_argument("--show", action="store_true")
+    args = parser.parse_args()
+
+    index = build_index(args.netlist, args.top)
+    total = sum(len(bits) for bits in index["signals"].values())
+    missing = sum(len(bits) for bits in index["missing"].values())
+    print(f"netlist_index: {index['top']}, {index['nets']} nets, {total - missing}/{total} probe bits mapped")
+    for signal, bits in index["missing"].items():
+        print(f"  {signal}: no net for bits {bits}, test.py falls back to GL_PROBE_NAMES")
+    if args.show:
+        for signal, bits in index["signals"].items():
+            for bit, entry in enumerate(bits):
+                print(f"  {signal}[{bit}] = {entry}")
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as index_file:
+            json.dump(index, index_file, indent=1)
+
+if __name__ == "__main__":
+    sys.exit(main())
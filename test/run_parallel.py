@@ -0,0 +1,166 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+# Runs the @cocotb.test()s of a test module as parallel make invocations, one simulator per shard.
+# Every shard gets its own SIM_BUILD (and with it its own program.hex, traces and VCD) and results file,
+# and the per-shard results are merged into a single results.xml for the CI "! grep failure results.xml" check.
+# The image is compiled once into the compile cache (sim_cache.py) before the shards start, so every shard restores it.
+#
+#   python run_parallel.py                      # RTL, one test per shard, os.cpu_count() shards at a time
+#   python run_parallel.py --gates              # GATES=yes
+#   python run_parallel.py -j 8 --group 2 -- FUZZ_PROGRAMS=2000
+#   python run_parallel.py -f Makefile_adder_accumulator
+#   python run_parallel.py --vcd -k random_program_regression   # full VCD per shard
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Regex instead of importing/parsing the module: it does not need cocotb and still works on a file that does not compile
+TEST_PATTERN = re.compile(r"^@cocotb\.test\(([^\n]*)\)\s*\n(?:@[^\n]*\n)*\s*async\s+def\s+(\w+)", re.MULTILINE)
+
+def module_of(makefile):
+    with open(os.path.join(TEST_DIR, makefile)) as f:
+        match = re.search(r"^MODULE\s*\??=\s*(\S+)", f.read(), re.MULTILINE)
+    assert match, f"No MODULE in {makefile}"
+    return match.group(1)
+
+def discover_tests(module):
+    # [(test name, skip= expression or None)]
+    with open(os.path.join(TEST_DIR, f"{module}.py")) as f:
+        found = TEST_PATTERN.findall(f.read())
+    return [(name, arguments.split("skip=", 1)[1] if "skip=" in arguments else None) for arguments, name in found]
+
+def skipped_in_run(condition, make_variables):
+    # cocotb 1.9 runs a test named in TESTCASE even when its skip condition holds, so evaluate the condition here
+    # against the environment the shards get (make passes its command line variables on). The conditions only look
+    # at os.environ, anything else runs the test
+    environ = dict(os.environ)
+    environ.update(variable.split("=", 1) for variable in make_variables if "=" in variable)
+    try:
+        return bool(eval(condition, {"os": SimpleNamespace(environ=environ)}))
+    except Exception:
+        return False
+
+def make_variables(args):
+    # The make variables every invocation shares, the precompile has to hash to the same cache key as the shards
+    variables = ["GATES=yes"] if args.gates else []
+    return variables + args.make_args
+
+def precompile(args, build_root):
+    # Build the simulator image once and store it in the compile cache, the shards then hit the cache instead of
+    # all compiling the same image at the same time. Returns (exit code, log file, seconds)
+    compile_dir = os.path.join(build_root, "compile")
+    os.makedirs(compile_dir, exist_ok=True)
+    log = os.path.join(compile_dir, "compile.log")
+    command = ["make", "-f", args.makefile, f"SIM_BUILD={compile_dir}"] + make_variables(args) + [os.path.join(compile_dir, "sim_cache.stored")]
+    start = time.perf_counter()
+    with open(log, "w") as log_file:
+        code = subprocess.call(command, cwd=TEST_DIR, stdout=log_file, stderr=subprocess.STDOUT)
+    return code, log, time.perf_counter() - start
+
+def run_shard(index, tests, args, build_root):
+    # One make invocation for a group of tests, returns (index, tests, exit code, results file, log file, seconds)
+    shard_dir = os.path.join(build_root, f"shard_{index}")
+    os.makedirs(shard_dir, exist_ok=True)
+    results = os.path.join(shard_dir, "results.xml")
+    log = os.path.join(shard_dir, "sim.log")
+    if os.path.exists(results):
+        os.remove(results)
+    command = ["make", "-f", args.makefile,
+               f"SIM_BUILD={shard_dir}",
+               f"TESTCASE={','.join(tests)}",
+               f"COCOTB_RESULTS_FILE={results}"]
+    if args.vcd:
+        command.append(f"VCD_FILE={os.path.join(shard_dir, 'tb.vcd')}")
+    command += make_variables(args)
+    start = time.perf_counter()
+    with open(log, "w") as log_file:
+        code = subprocess.call(command, cwd=TEST_DIR, stdout=log_file, stderr=subprocess.STDOUT)
+    return index, tests, code, results, log, time.perf_counter() - start
+
+def merge_results(shards, skipped, output):
+    # cocotb writes <testsuites><testsuite>...<testcase/>...</testsuite></testsuites>, keep that layout.
+    # A shard that died before writing its file gets a failing testcase per test so the CI check still trips
+    suites = ET.Element("testsuites", name="results")
+    suite = ET.SubElement(suites, "testsuite", name="all", package="all")
+    failed = []
+    for test in skipped:
+        case = ET.SubElement(suite, "testcase", name=test, classname="run_parallel", time="0")
+        ET.SubElement(case, "skipped", message="skip= condition holds for this run")
+    for index, tests, code, results, log, seconds in shards:
+        cases = []
+        if os.path.exists(results):
+            try:
+                cases = ET.parse(results).getroot().findall(".//testcase")
+            except ET.ParseError:
+                cases = []
+        seen = {case.get("name") for case in cases}
+        for case in cases:
+            suite.append(case)
+            if case.find("failure") is not None or case.find("error") is not None:
+                failed.append(case.get("name"))
+        for test in tests:
+            if test not in seen:
+                case = ET.SubElement(suite, "testcase", name=test, classname="shard", time=f"{seconds:.2f}")
+                ET.SubElement(case, "failure", message=f"shard {index} exited with code {code} before reporting this test, see {log}")
+                failed.append(test)
+    ET.ElementTree(suites).write(output, encoding="UTF-8", xml_declaration=True)
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Run cocotb tests in parallel shards and merge results.xml")
+    parser.add_argument("-f", "--makefile", default="Makefile")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1, help="shards running at the same time")
+    parser.add_argument("--group", type=int, default=1, help="tests per shard")
+    parser.add_argument("--gates", action="store_true", help="gate level run (GATES=yes)")
+    parser.add_argument("--vcd", action="store_true", help="full VCD dump per shard (shard_N/tb.vcd)")
+    parser.add_argument("-k", "--tests", help="comma separated subset of tests to run")
+    parser.add_argument("-o", "--output", default="results.xml", help="merged results file, relative to test/")
+    parser.add_argument("make_args", nargs="*", help="extra make variables, e.g. FUZZ_PROGRAMS=2000 (put them after --)")
+    args = parser.parse_args()
+
+    found = discover_tests(module_of(args.makefile))
+    tests = [test for test, _ in found]
+    if args.tests:
+        wanted = args.tests.split(",")
+        unknown = [test for test in wanted if test not in tests]
+        assert not unknown, f"Unknown tests: {unknown}"
+        found = [(test, condition) for test, condition in found if test in wanted]
+    skipped = [test for test, condition in found if condition and skipped_in_run(condition, make_variables(args))]
+    tests = [test for test, _ in found if test not in skipped]
+    groups = [tests[i:i + args.group] for i in range(0, len(tests), args.group)]
+    build_root = os.path.join(TEST_DIR, "sim_build", "gl" if args.gates else "rtl", "parallel")
+    print(f"{len(tests)} tests in {len(groups)} shards, {args.jobs} at a time, {'GL' if args.gates else 'RTL'}")
+    if skipped:
+        print(f"  skipped: {','.join(skipped)}")
+
+    start = time.perf_counter()
+    if "SIM_CACHE=0" not in args.make_args:
+        code, log, seconds = precompile(args, build_root)
+        # On failure every shard compiles (and reports the error) on its own
+        print(f"  compile   exit={code} {seconds:7.1f}s  {log}")
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        futures = [pool.submit(run_shard, index, group, args, build_root) for index, group in enumerate(groups)]
+        shards = []
+        for future in futures:
+            shard = future.result()
+            shards.append(shard)
+            index, group, code, _, log, seconds = shard
+            print(f"  shard {index:3d} exit={code} {seconds:7.1f}s  {','.join(group)}")
+    failed = merge_results(shards, skipped, os.path.join(TEST_DIR, args.output))
+    print(f"{len(tests) - len(failed)}/{len(tests)} passed in {time.perf_counter() - start:.1f}s, results in {args.output}")
+    for test in failed:
+        print(f"  FAIL {test}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
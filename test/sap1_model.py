@@ -0,0 +1,412 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+# Reference models of the SAP-1 CPU in src/: instruction-level (Sap1Model), clock-by-clock (Sap1CycleModel)
+# and a random program generator. Plain Python, no cocotb import, so it can also be used outside of a simulation
+
+import random
+import time
+
+# Opcodes, same values as the OP_* localparams in src/control_block.v
+OP_HLT = 0x0
+OP_NOP = 0x1
+OP_ADD = 0x2
+OP_SUB = 0x3
+OP_LDA = 0x4
+OP_OUT = 0x5
+OP_STA = 0x6
+OP_JMP = 0x7
+
+OPCODE_NAMES = {OP_HLT: 'HLT', OP_NOP: 'NOP', OP_ADD: 'ADD', OP_SUB: 'SUB',
+                OP_LDA: 'LDA', OP_OUT: 'OUT', OP_STA: 'STA', OP_JMP: 'JMP'}
+
+RAM_SIZE = 16
+
+# Control word bit positions, same as the SIG_* localparams in src/control_block.v (and signal_dict in test.py)
+SIG_PC_INC = 14             # C_P
+SIG_PC_EN = 13              # E_P
+SIG_PC_LOAD = 12            # L_P
+SIG_MAR_ADDR_LOAD_N = 11    # \L_MA
+SIG_MAR_MEM_LOAD_N = 10     # \L_MD
+SIG_RAM_EN_N = 9            # \CE
+SIG_RAM_LOAD_N = 8          # \L_R
+SIG_IR_LOAD_N = 7           # \L_I
+SIG_IR_EN_N = 6             # \E_I
+SIG_REGA_LOAD_N = 5         # \L_A
+SIG_REGA_EN = 4             # E_A
+SIG_ADDER_SUB = 3           # S_U
+SIG_REGB_EN = 2             # E_U
+SIG_REGB_LOAD_N = 1         # \L_B
+SIG_OUT_LOAD_N = 0          # \L_O
+
+CONTROL_IDLE = 0b000111111100011    # Every signal deasserted
+
+# Signals asserted on top of CONTROL_IDLE for each step, active-low ones are listed by bit and get cleared
+_MICRO_OPS = {
+    # (stage, opcode or None for any, programming): asserted bits
+    (0, None, 0): (SIG_PC_EN, SIG_MAR_ADDR_LOAD_N),
+    (0, None, 1): (SIG_PC_EN, SIG_MAR_ADDR_LOAD_N),
+    (1, None, 0): (SIG_PC_INC,),
+    (1, None, 1): (SIG_PC_INC,),
+    (2, None, 0): (SIG_RAM_EN_N, SIG_IR_LOAD_N),
+    (3, None, 1): (SIG_MAR_MEM_LOAD_N,),
+    (4, None, 1): (SIG_RAM_LOAD_N,),
+    (3, OP_ADD, 0): (SIG_IR_EN_N, SIG_MAR_ADDR_LOAD_N),
+    (3, OP_SUB, 0): (SIG_IR_EN_N, SIG_MAR_ADDR_LOAD_N),
+    (3, OP_LDA, 0): (SIG_IR_EN_N, SIG_MAR_ADDR_LOAD_N),
+    (3, OP_STA, 0): (SIG_IR_EN_N, SIG_MAR_ADDR_LOAD_N),
+    (3, OP_OUT, 0): (SIG_REGA_EN, SIG_OUT_LOAD_N),
+    (3, OP_JMP, 0): (SIG_IR_EN_N, SIG_PC_LOAD),
+    (4, OP_ADD, 0): (SIG_RAM_EN_N, SIG_REGB_LOAD_N),
+    (4, OP_SUB, 0): (SIG_RAM_EN_N, SIG_REGB_LOAD_N),
+    (4, OP_LDA, 0): (SIG_RAM_EN_N, SIG_REGA_LOAD_N),
+    (4, OP_STA, 0): (SIG_REGA_EN, SIG_MAR_MEM_LOAD_N),
+    (5, OP_ADD, 0): (SIG_REGB_EN, SIG_REGA_LOAD_N),
+    (5, OP_SUB, 0): (SIG_ADDER_SUB, SIG_REGB_EN, SIG_REGA_LOAD_N),
+    (5, OP_STA, 0): (SIG_RAM_LOAD_N,),
+}
+
+# Burst programming (programming and burst held): T0 as usual, then every T3 writes ui_in into RAM[MAR] and steps the
+# MAR address and the PC. The stages not listed keep the handshake words
+_BURST_OPS = {
+    3: (SIG_RAM_LOAD_N, SIG_PC_INC),
+}
+
+# Last micro-step of each opcode (last_stage in src/control_block.v), the stage after it is T0 (T2 after a prefetch).
+# Opcodes not listed (NOP, OUT, JMP, HLT and 0x8-0xF) are done in T3. Stage 6 is only used to leave reset
+_LAST_STAGES = {OP_ADD: 5, OP_SUB: 5, OP_STA: 5, OP_LDA: 4}
+
+def last_stage(opcode, programming=0):
+    return 5 if programming else _LAST_STAGES.get(opcode, 3)
+
+# Opcodes whose last step also does the next instruction's T0 and T1 (prefetch in src/control_block.v),
+# the next instruction then starts at T2. NOP and the unused 0x8-0xF leave everything free in T3, STA only writes the RAM in T5
+PREFETCH_OPCODES = frozenset((OP_NOP, OP_STA) + tuple(range(0x8, 0x10)))
+_PREFETCH = (SIG_PC_EN, SIG_MAR_ADDR_LOAD_N, SIG_PC_INC)
+
+# Cycles per instruction of the original schedule: T0-T5 and stage 6 for every opcode
+FIXED_CPI = 7
+
+def microcode_index(opcode, stage, programming=0, burst=0):
+    # Flat index into MICROCODE, stage is the 3 bit stage register so 6 (reset/wrap) and 7 (halted) are included.
+    # burst only changes the word together with programming
+    return (burst << 8) | (programming << 7) | (opcode << 3) | stage
+
+def _build_microcode():
+    table = [CONTROL_IDLE] * 512
+    for burst in (0, 1):
+        for programming in (0, 1):
+            for opcode in range(16):
+                for stage in range(8):
+                    word = CONTROL_IDLE
+                    if burst and programming and stage in _BURST_OPS:
+                        bits = _BURST_OPS[stage]
+                    else:
+                        bits = _MICRO_OPS.get((stage, None, programming), ()) + _MICRO_OPS.get((stage, opcode, programming), ())
+                    if not programming and opcode in PREFETCH_OPCODES and stage == last_stage(opcode):
+                        bits += _PREFETCH
+                    for bit in bits:
+                        word ^= (1 << bit)      # Flips the idle level, i.e. asserts both active-high and active-low signals
+                    table[microcode_index(opcode, stage, programming, burst)] = word
+    return table
+
+# Expected control_signals for every (burst, programming, opcode, stage), index with microcode_index()
+MICROCODE = _build_microcode()
+
+def control_word(opcode, stage, programming=0, burst=0):
+    return MICROCODE[microcode_index(opcode, stage, programming, burst)]
+
+def next_stage(opcode, programming=0):
+    # Stage after the last one: T2 when it prefetched the next instruction, T0 otherwise
+    return 2 if not programming and opcode in PREFETCH_OPCODES else 0
+
+def instruction_cycles(opcode):
+    # Clock cycles the instruction adds to a run: its T0 to the next T0, less the T0 and T1 it prefetches
+    return last_stage(opcode) + 1 - next_stage(opcode)
+
+def load_cycles(n_bytes, burst=False):
+    # Rising edges from the one that leaves reset (stage 6) to the one that writes the last byte.
+    # Handshake programming writes at the end of T4 and runs T0-T5 per byte, burst programming (uio_in[6])
+    # does T0 once and then writes one byte at the end of every T3 (Sap1CycleModel with burst=1 gives the same)
+    return n_bytes + 2 if burst else 6 * n_bytes
+
+def alu(a, b, sub):
+    # Same as src/add_sub_8bit.v, subtraction is A + ~B + 1 so CF=1 means "no borrow"
+    total = a + ((b ^ 0xFF) + 1 if sub else b)
+    value = total & 0xFF
+    return value, (total >> 8) & 1, int(value == 0)
+
+class Sap1Model:
+    # One step() is one whole instruction (fetch + execute), opcodes 0x8-0xF decode as NOP like in the RTL
+    # CF and ZF only change on ADD/SUB since the ALU only latches them while driving the bus
+    __slots__ = ('mem', 'a', 'b', 'pc', 'out', 'cf', 'zf', 'hf', 'instructions')
+
+    def __init__(self, program=(), a=0, b=0, pc=0, out=0, cf=0, zf=0, hf=0):
+        self.mem = bytearray(RAM_SIZE)
+        self.mem[:len(program)] = bytes(program)
+        self.a = a
+        self.b = b
+        self.pc = pc
+        self.out = out
+        self.cf = cf
+        self.zf = zf
+        self.hf = hf
+        self.instructions = 0
+
+    def copy(self):
+        clone = Sap1Model(self.mem, self.a, self.b, self.pc, self.out, self.cf, self.zf, self.hf)
+        clone.instructions = self.instructions
+        return clone
+
+    def state(self):
+        # Everything the DUT exposes, in a form that can be compared with ==
+        return (self.pc, self.a, self.b, self.out, self.cf, self.zf, self.hf, bytes(self.mem))
+
+    def step(self):
+        # Execute one instruction, returns its opcode or None if the CPU is already halted
+        if self.hf:
+            return None
+        mem = self.mem
+        instruction = mem[self.pc]
+        opcode = instruction >> 4
+        operand = instruction & 0xF
+        self.pc = (self.pc + 1) & 0xF       # PC increments in T1, before the instruction is decoded
+        self.instructions += 1
+        if opcode == OP_ADD or opcode == OP_SUB:
+            self.b = mem[operand]
+            self.a, self.cf, self.zf = alu(self.a, self.b, opcode == OP_SUB)
+        elif opcode == OP_LDA:
+            self.a = mem[operand]
+        elif opcode == OP_OUT:
+            self.out = self.a
+        elif opcode == OP_STA:
+            mem[operand] = self.a
+        elif opcode == OP_JMP:
+            self.pc = operand
+        elif opcode == OP_HLT:
+            self.hf = 1
+        return opcode
+
+    def run(self, max_instructions=1 << 20):
+        # Run until HLT or max_instructions, returns the number of instructions executed
+        # Same as calling step() in a loop, but with the state kept in locals since this is the hot path for the fuzzers
+        if self.hf:
+            return 0
+        mem = self.mem
+        a, b, pc, out, cf, zf = self.a, self.b, self.pc, self.out, self.cf, self.zf
+        hf = 0
+        count = 0
+        while count < max_instructions:
+            instruction = mem[pc]
+            opcode = instruction >> 4
+            pc = (pc + 1) & 0xF
+            count += 1
+            if opcode == 2:     # ADD
+                b = mem[instruction & 0xF]
+                total = a + b
+                a = total & 0xFF
+                cf = total >> 8
+                zf = int(a == 0)
+            elif opcode == 3:   # SUB
+                b = mem[instruction & 0xF]
+                total = a + 0x100 - b
+                a = total & 0xFF
+                cf = total >> 8
+                zf = int(a == 0)
+            elif opcode == 4:   # LDA
+                a = mem[instruction & 0xF]
+            elif opcode == 5:   # OUT
+                out = a
+            elif opcode == 6:   # STA
+                mem[instruction & 0xF] = a
+            elif opcode == 7:   # JMP
+                pc = instruction & 0xF
+            elif opcode == 0:   # HLT
+                hf = 1
+                break
+        self.a, self.b, self.pc, self.out, self.cf, self.zf, self.hf = a, b, pc, out, cf, zf, hf
+        self.instructions += count
+        return count
+
+_PC_EN = 1 << SIG_PC_EN
+_PC_INC = 1 << SIG_PC_INC
+_PC_LOAD = 1 << SIG_PC_LOAD
+_MAR_ADDR_LOAD_N = 1 << SIG_MAR_ADDR_LOAD_N
+_MAR_MEM_LOAD_N = 1 << SIG_MAR_MEM_LOAD_N
+_RAM_EN_N = 1 << SIG_RAM_EN_N
+_RAM_LOAD_N = 1 << SIG_RAM_LOAD_N
+_IR_LOAD_N = 1 << SIG_IR_LOAD_N
+_IR_EN_N = 1 << SIG_IR_EN_N
+_REGA_LOAD_N = 1 << SIG_REGA_LOAD_N
+_REGA_EN = 1 << SIG_REGA_EN
+_ADDER_SUB = 1 << SIG_ADDER_SUB
+_REGB_EN = 1 << SIG_REGB_EN
+_REGB_LOAD_N = 1 << SIG_REGB_LOAD_N
+_OUT_LOAD_N = 1 << SIG_OUT_LOAD_N
+
+class Sap1CycleModel:
+    # Clock-by-clock model of src/tt_um_ece298a_8_bit_cpu.v. The attributes are what the DUT shows when sampled
+    # right after a rising edge (the values of the cycle that is ending), tick() then applies that edge.
+    # Reset is not modelled, seed it from the DUT at a T0 sample instead
+    __slots__ = ('mem', 'stage', 'pc', 'a', 'b', 'ir', 'mar_addr', 'mar_data', 'out', 'cf', 'zf', 'hf',
+                 'programming', 'burst', 'burst_stage', 'ui_in', 'cycles', 'instructions')
+
+    def __init__(self, program=(), stage=0, pc=0, a=0, b=0, ir=0x10, mar_addr=0, mar_data=0, out=0,
+                 cf=0, zf=0, hf=0, programming=0, burst=0, ui_in=0):
+        self.mem = bytearray(RAM_SIZE)
+        self.mem[:len(program)] = bytes(program)
+        self.stage = stage
+        self.pc = pc
+        self.a = a
+        self.b = b
+        self.ir = ir                # Reset value of the instruction register is NOP
+        self.mar_addr = mar_addr
+        self.mar_data = mar_data
+        self.out = out
+        self.cf = cf
+        self.zf = zf
+        self.hf = hf
+        self.programming = programming
+        self.burst = burst          # uio_in[6], only has an effect with programming
+        self.burst_stage = 0        # burst_stage in src/control_block.v, the stage just finished was a burst T0/T3
+        self.ui_in = ui_in
+        self.cycles = 0
+        self.instructions = 0       # Instructions decoded (reached T3) outside programming
+
+    def control(self):
+        if self.burst_stage and not (self.programming and self.burst):
+            return CONTROL_IDLE         # burst_end, the stage between the last burst write and T0
+        return MICROCODE[(self.burst << 8) | (self.programming << 7) | ((self.ir >> 4) << 3) | self.stage]
+
+    def bus(self, word=None):
+        # (value, mask) of the bus for a control word, bits outside the mask are Z
+        if word is None:
+            word = self.control()
+        if word & _PC_EN:
+            return self.pc, 0x0F
+        if not word & _RAM_EN_N:
+            return self.mem[self.mar_addr], 0xFF
+        if not word & _IR_EN_N:
+            return self.ir & 0xF, 0x0F
+        if word & _REGA_EN:
+            return self.a, 0xFF
+        if word & _REGB_EN:
+            return alu(self.a, self.b, word & _ADDER_SUB)[0], 0xFF
+        if self.programming and self.stage == 3:
+            return self.ui_in, 0xFF     # read_ui_in
+        return 0, 0x00
+
+    def tick(self):
+        # Apply one rising edge (registers load what the current control word selects) and the falling edge after it
+        word = self.control()
+        bus = self.bus(word)[0]
+        opcode = self.ir >> 4
+        burst_mode = self.programming and self.burst
+        if burst_mode and self.stage == 3:
+            self.mem[self.mar_addr] = self.ui_in        # burst_load: ui_in straight into the RAM, then the next address
+            self.mar_addr = (self.mar_addr + 1) & 0xF
+        elif not word & _RAM_LOAD_N:
+            self.mem[self.mar_addr] = self.mar_data
+        if word & _REGB_EN:
+            _, self.cf, self.zf = alu(self.a, self.b, word & _ADDER_SUB)
+        if not word & _MAR_ADDR_LOAD_N:
+            self.mar_addr = bus & 0xF
+        if not word & _MAR_MEM_LOAD_N:
+            self.mar_data = bus
+        if not word & _IR_LOAD_N:
+            self.ir = bus
+        if not word & _REGA_LOAD_N:
+            self.a = bus
+        if not word & _REGB_LOAD_N:
+            self.b = bus
+        if not word & _OUT_LOAD_N:
+            self.out = bus
+        if word & _PC_LOAD:
+            self.pc = bus & 0xF
+        elif word & _PC_INC:
+            self.pc = (self.pc + 1) & 0xF
+        stage = self.stage
+        if self.hf:
+            stage = 7
+        elif stage == 6:
+            stage = 0
+        elif burst_mode and stage in (0, 3):
+            stage = 3
+        elif self.burst_stage:
+            stage = 0
+        elif stage <= 5:
+            stage = next_stage(opcode, self.programming) if stage == last_stage(opcode, self.programming) else stage + 1
+        else:
+            stage = 6
+        self.burst_stage = int(burst_mode and self.stage in (0, 3))
+        self.stage = stage
+        if stage == 3 and not self.programming:
+            self.instructions += 1
+            if (self.ir >> 4) == OP_HLT:
+                self.hf = 1             # hlt_flag is set on the falling edge of T3, before the next sample
+        self.cycles += 1
+
+    def run(self, max_cycles=1 << 16):
+        # Tick until the CPU halts (stage 7), returns the number of cycles taken
+        start = self.cycles
+        while self.stage != 7 and self.cycles - start < max_cycles:
+            self.tick()
+        return self.cycles - start
+
+def cycles_per_instruction(program, max_cycles=1 << 16):
+    # (cycles, instructions, CPI) of running program from reset exit to HLT on the cycle model, HLT included
+    model = Sap1CycleModel(program, stage=6)
+    cycles = model.run(max_cycles)
+    return cycles, model.instructions, cycles / model.instructions if model.instructions else 0.0
+
+# Data values the fuzzer favours, they sit on the carry/zero/sign boundaries of the ALU
+EDGE_VALUES = (0x00, 0x01, 0x7F, 0x80, 0xFE, 0xFF)
+
+def random_program(rng, min_code=2, max_code=12):
+    # Random program that always terminates: code at 0..n-1 ending in HLT, data after it.
+    # JMPs only go forward (at most to the final HLT) and STA only writes the data region,
+    # so the code cannot loop or overwrite itself
+    code_len = rng.randint(min_code, min(max_code, RAM_SIZE - 2))
+    hlt_addr = code_len - 1
+    data_start = code_len
+    program = [0] * RAM_SIZE
+    for addr in range(data_start, RAM_SIZE):
+        program[addr] = rng.choice(EDGE_VALUES) if rng.random() < 0.3 else rng.randrange(256)
+    for addr in range(hlt_addr):
+        opcode = rng.choice((OP_ADD, OP_ADD, OP_SUB, OP_SUB, OP_LDA, OP_LDA, OP_STA, OP_OUT, OP_OUT, OP_JMP, OP_NOP, OP_HLT))
+        if opcode in (OP_ADD, OP_SUB, OP_LDA):
+            # Mostly data, sometimes code bytes (valid reads, just less interesting values)
+            operand = rng.randrange(data_start, RAM_SIZE) if rng.random() < 0.85 else rng.randrange(RAM_SIZE)
+        elif opcode == OP_STA:
+            operand = rng.randrange(data_start, RAM_SIZE)
+        elif opcode == OP_JMP:
+            operand = rng.randint(addr + 1, hlt_addr)
+        elif opcode == OP_NOP:
+            opcode = rng.choice((OP_NOP, rng.randrange(0x8, 0x10)))     # 0x8-0xF are unused and decode as NOP
+            operand = rng.randrange(16)
+        else:
+            operand = rng.randrange(16)     # Ignored by OUT/HLT
+        program[addr] = (opcode << 4) | operand
+    program[hlt_addr] = (OP_HLT << 4) | rng.randrange(16)
+    return program
+
+def disassemble(program):
+    # One line per byte, e.g. "3: ADD 0xE"
+    lines = []
+    for addr, instruction in enumerate(program):
+        name = OPCODE_NAMES.get(instruction >> 4, 'NOP')
+        lines.append(f"{addr:X}: {name} 0x{instruction & 0xF:X}  ({instruction:02X})")
+    return lines
+
+if __name__ == "__main__":
+    # Quick throughput check: a program that loops forever (ADD, SUB, STA, OUT, LDA, JMP 0)
+    model = Sap1Model([0x2E, 0x3F, 0x6D, 0x50, 0x4D, 0x70] + [0] * 8 + [0x03, 0x01])
+    count = 2_000_000
+    start = time.perf_counter()
+    model.run(count)
+    elapsed = time.perf_counter() - start
+    print(f"{count} instructions in {elapsed:.3f} s, {count / elapsed / 1e6:.2f} M instructions/s")
+    for seed in range(3):
+        program = random_program(random.Random(seed))
+        cycles, instructions, cpi = cycles_per_instruction(program)
+        print(f"random program {seed}: {instructions} instructions in {cycles} cycles, CPI {cpi:.2f} (was {FIXED_CPI})")
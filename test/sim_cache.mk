@@ -0,0 +1,31 @@
+# Compile cache, included after Makefile.sim (see sim_cache.py)
+# Set SIM_CACHE=0 to always compile
+
+SIM_CACHE ?= 1
+SIM_CACHE_IMAGE_icarus = $(SIM_BUILD)/sim.vvp
+SIM_CACHE_IMAGE_verilator = $(SIM_BUILD)/Vtop
+SIM_CACHE_IMAGE = $(SIM_CACHE_IMAGE_$(SIM))
+
+ifeq ($(SIM_CACHE),1)
+ifneq ($(SIM_CACHE_IMAGE),)
+ifeq ($(filter clean,$(MAKECMDGOALS)),)
+
+# "sim" re-invokes make, the exported status keeps the nested make from restoring (and counting) a second time
+ifndef SIM_CACHE_STATUS
+SIM_CACHE_STATUS := $(shell $(PYTHON_BIN) $(PWD)/sim_cache.py restore --sim=$(SIM) --build=$(SIM_BUILD) --toplevel=$(TOPLEVEL) --gates=$(GATES) --compile-args='$(COMPILE_ARGS)' $(VERILOG_SOURCES))
+$(info sim_cache: $(SIM_CACHE_STATUS))
+export SIM_CACHE_STATUS
+endif
+
+# Stores the image once it is compiled, a hit finds the entry already there
+SIM_CACHE_STAMP = $(SIM_BUILD)/sim_cache.stored
+
+$(SIM_CACHE_STAMP): $(SIM_CACHE_IMAGE)
+	@$(PYTHON_BIN) $(PWD)/sim_cache.py store --sim=$(SIM) --build=$(SIM_BUILD) --key=$(word 2,$(SIM_CACHE_STATUS))
+	@touch $@
+
+$(COCOTB_RESULTS_FILE): $(SIM_CACHE_STAMP)
+
+endif
+endif
+endif
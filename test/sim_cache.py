@@ -0,0 +1,189 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+# Content-hashed cache of the compiled simulator image (sim.vvp for icarus, Vtop for verilator).
+# The key covers the contents of every VERILOG_SOURCES file, COMPILE_ARGS, GATES, TOPLEVEL and the simulator version.
+# The Makefile calls "restore" while it is parsed: on a hit the cached image is copied into SIM_BUILD with a fresh
+# mtime, so make sees it as up to date and skips elaboration. After a compile "store" copies the new image in.
+# The cache lives in sim_build/cache, next to sim_build/rtl and sim_build/gl, so "make clean" leaves it alone.
+#
+#   python sim_cache.py stats     # hits, misses and entries
+#   python sim_cache.py clear
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.environ.get("SIM_CACHE_DIR", os.path.join(TEST_DIR, "sim_build", "cache"))
+
+# Files that make up the image, in the order make expects their mtimes to increase
+IMAGES = {
+    "icarus": ("cmds.f", "sim.vvp"),
+    "verilator": ("Vtop.mk", "Vtop"),
+}
+
+VERSION_COMMANDS = {
+    "icarus": ["iverilog", "-V"],
+    "verilator": ["verilator", "--version"],
+}
+
+# Least recently used entries past this count are removed on store
+MAX_ENTRIES = int(os.environ.get("SIM_CACHE_ENTRIES", "8"))
+
+def simulator_version(sim):
+    try:
+        output = subprocess.run(VERSION_COMMANDS[sim], capture_output=True, text=True).stdout
+    except (KeyError, OSError):
+        return "unknown"
+    # iverilog -V prints its usage after the version line, only the first line identifies the build
+    return output.splitlines()[0] if output else "unknown"
+
+def load_json(path, default):
+    try:
+        with open(path) as json_file:
+            return json.load(json_file)
+    except (OSError, ValueError):
+        return default
+
+def write_json(path, data):
+    # Write then rename, parallel shards share the cache directory
+    temporary = f"{path}.{os.getpid()}"
+    with open(temporary, "w") as json_file:
+        json.dump(data, json_file)
+    os.replace(temporary, path)
+
+def file_digest(path, digests):
+    # The GL cell library is tens of MB, so digests are remembered by (size, mtime) and only recomputed when those change
+    stat = os.stat(path)
+    known = digests.get(path)
+    if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+        return known[2]
+    sha = hashlib.sha256()
+    with open(path, "rb") as source:
+        for chunk in iter(lambda: source.read(1 << 20), b""):
+            sha.update(chunk)
+    digests[path] = [stat.st_size, stat.st_mtime_ns, sha.hexdigest()]
+    return digests[path][2]
+
+def cache_key(sim, build, toplevel, gates, compile_args, sources):
+    digests_path = os.path.join(CACHE_DIR, "digests.json")
+    digests = load_json(digests_path, {})
+    sha = hashlib.sha256()
+    for part in (sim, simulator_version(sim), toplevel, gates, " ".join(compile_args.split())):
+        sha.update(part.encode() + b"\0")
+    build = os.path.abspath(build)
+    for source in sources:
+        path = os.path.abspath(source)
+        sha.update(os.path.basename(path).encode() + b"\0")
+        # Files generated into SIM_BUILD (cocotb's waveform dump module) do not exist yet when the Makefile is parsed
+        if path.startswith(build + os.sep):
+            sha.update(b"generated\0")
+        elif os.path.exists(path):
+            sha.update(file_digest(path, digests).encode() + b"\0")
+        else:
+            sha.update(b"missing\0")
+    write_json(digests_path, digests)
+    return sha.hexdigest()[:24]
+
+def count(field):
+    stats_path = os.path.join(CACHE_DIR, "stats.json")
+    stats = load_json(stats_path, {"hit": 0, "miss": 0, "store": 0})
+    stats[field] = stats.get(field, 0) + 1
+    write_json(stats_path, stats)
+
+def restore(args):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    key = cache_key(args.sim, args.build, args.toplevel, args.gates, args.compile_args, args.sources)
+    entry = os.path.join(CACHE_DIR, key)
+    files = IMAGES.get(args.sim)
+    if files is None:
+        print(f"off {key}")
+        return
+    if not all(os.path.exists(os.path.join(entry, name)) for name in files):
+        # Whatever image is in SIM_BUILD was not built from these inputs (COMPILE_ARGS changed, or the other
+        # Makefile shares the directory), make only compares mtimes so remove it to force the compile
+        for name in files:
+            if os.path.exists(os.path.join(args.build, name)):
+                os.remove(os.path.join(args.build, name))
+        count("miss")
+        print(f"miss {key}")
+        return
+    os.makedirs(args.build, exist_ok=True)
+    now = time.time()
+    for offset, name in enumerate(files):
+        target = os.path.join(args.build, name)
+        shutil.copy2(os.path.join(entry, name), target)
+        # Newer than every source, and each file newer than the one it is built from
+        os.utime(target, (now + offset, now + offset))
+    os.utime(entry)
+    count("hit")
+    print(f"hit {key}")
+
+def store(args):
+    entry = os.path.join(CACHE_DIR, args.key)
+    files = IMAGES[args.sim]
+    if os.path.isdir(entry) or not all(os.path.exists(os.path.join(args.build, name)) for name in files):
+        return
+    temporary = f"{entry}.{os.getpid()}"
+    os.makedirs(temporary, exist_ok=True)
+    for name in files:
+        shutil.copy2(os.path.join(args.build, name), os.path.join(temporary, name))
+    try:
+        os.rename(temporary, entry)
+    except OSError:
+        # Another shard stored the same key first
+        shutil.rmtree(temporary, ignore_errors=True)
+        return
+    count("store")
+    print(f"sim_cache: stored {args.key}")
+    evict()
+
+def entries():
+    if not os.path.isdir(CACHE_DIR):
+        return []
+    paths = [os.path.join(CACHE_DIR, name) for name in os.listdir(CACHE_DIR)]
+    return sorted((path for path in paths if os.path.isdir(path)), key=os.path.getmtime, reverse=True)
+
+def evict():
+    for path in entries()[MAX_ENTRIES:]:
+        shutil.rmtree(path, ignore_errors=True)
+
+def stats(args):
+    counts = load_json(os.path.join(CACHE_DIR, "stats.json"), {})
+    hits, misses = counts.get("hit", 0), counts.get("miss", 0)
+    total = hits + misses
+    print(f"{hits} hits, {misses} misses ({100 * hits / total if total else 0:.0f}% hit rate), {counts.get('store', 0)} stores")
+    for path in entries():
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        print(f"  {os.path.basename(path)}  {size / 1e6:7.1f} MB  {time.ctime(os.path.getmtime(path))}")
+
+def clear(args):
+    shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-hashed cache of the compiled simulator image")
+    commands = parser.add_subparsers(dest="command", required=True)
+    restore_parser = commands.add_parser("restore", help="copy a cached image into SIM_BUILD, prints hit/miss and the key")
+    restore_parser.add_argument("--sim", required=True)
+    restore_parser.add_argument("--build", required=True)
+    restore_parser.add_argument("--toplevel", default="")
+    restore_parser.add_argument("--gates", default="")
+    restore_parser.add_argument("--compile-args", default="")
+    restore_parser.add_argument("sources", nargs="*")
+    store_parser = commands.add_parser("store", help="copy a freshly compiled image into the cache")
+    store_parser.add_argument("--sim", required=True)
+    store_parser.add_argument("--build", required=True)
+    store_parser.add_argument("--key", required=True)
+    commands.add_parser("stats")
+    commands.add_parser("clear")
+    args = parser.parse_args()
+    {"restore": restore, "store": store, "stats": stats, "clear": clear}[args.command](args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+# SPDX-FileCopyrightText: © 2024 Tiny Tapeout
+# SPDX-License-Identifier: Apache-2.0
+
+# Gate count and logic depth of add_sub_8bit.v for every ADDER_ARCH, from a yosys run on the adder alone.
+# Without --liberty the adder is mapped to yosys' generic 2-input gates (depth = gates on the longest path),
+# with it to the cells of that library, e.g. the sky130 one the GDS flow uses:
+#
+#   python synth_adder.py
+#   python synth_adder.py --liberty $PDK_ROOT/sky130A/libs.ref/sky130_fd_sc_hd/lib/sky130_fd_sc_hd__tt_025C_1v80.lib
+#
+# --no-abc stops at yosys' own gate mapping (no ABC optimisation, so the counts are higher), for builds where ABC
+# does not run, e.g. YoWASP's yowasp-yosys quits without output at the first abc pass:
+#
+#   python synth_adder.py --yosys yowasp-yosys --no-abc
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+TEST_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(TEST_DIR, "..", "src")
+SOURCES = ("onebitfa.v", "add_sub_8bit.v")
+
+ARCHITECTURES = ((0, "ripple carry"), (1, "carry-lookahead"), (2, "Kogge-Stone"))
+
+def script(arch, liberty, abc=True):
+    sources = " ".join(os.path.join(SRC_DIR, name) for name in SOURCES)
+    if not abc:
+        return (f"read_verilog -DADDER_ARCH={arch} {sources}; "
+                f"synth -flatten -noabc -top add_sub_8bit; opt_clean; stat; ltp -noff")
+    mapping = f"abc -liberty {liberty}" if liberty else "abc -g AND,NAND,OR,NOR,XOR,XNOR,ANDNOT,ORNOT"
+    return (f"read_verilog -DADDER_ARCH={arch} {sources}; "
+            f"synth -flatten -top add_sub_8bit; {mapping}; opt_clean; "
+            f"stat{f' -liberty {liberty}' if liberty else ''}; ltp -noff")
+
+def synthesize(arch, liberty, yosys, abc=True):
+    # (cells, depth, area or None) parsed from the yosys log
+    result = subprocess.run([yosys, "-p", script(arch, liberty, abc)], capture_output=True, text=True)
+    log = result.stdout + result.stderr
+    assert result.returncode == 0, f"yosys failed for ADDER_ARCH={arch}:\n{log}"
+    cells = re.search(r"Number of cells:\s+(\d+)", log) or re.search(r"^\s*(\d+)\s+cells\s*$", log, re.MULTILINE)
+    depth = re.search(r"Longest topological path in \S+ \(length=(\d+)\)", log)
+    area = re.search(r"Chip area for (?:top )?module '?\S+'?:\s+([\d.]+)", log)
+    assert cells and depth, f"yosys stopped before stat/ltp for ADDER_ARCH={arch} (try --no-abc), last lines:\n" + "\n".join(log.splitlines()[-5:])
+    return int(cells.group(1)), int(depth.group(1)), float(area.group(1)) if area else None
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the add_sub_8bit architectures after synthesis")
+    parser.add_argument("--liberty", help="map to the cells of this liberty file instead of generic gates")
+    parser.add_argument("--yosys", default="yosys")
+    parser.add_argument("--no-abc", dest="abc", action="store_false", help="skip ABC, count yosys' internal gates")
+    args = parser.parse_args()
+    if args.liberty and not args.abc:
+        parser.error("--liberty needs ABC for the cell mapping")
+
+    print(f"add_sub_8bit, {'cells of ' + os.path.basename(args.liberty) if args.liberty else 'generic 2-input gates'}{'' if args.abc else ', no ABC'}")
+    print(f"  {'ADDER_ARCH':<22} {'cells':>6} {'depth':>6} {'area':>9}")
+    for arch, name in ARCHITECTURES:
+        cells, depth, area = synthesize(arch, args.liberty, args.yosys, args.abc)
+        print(f"  {arch} {name:<20} {cells:6d} {depth:6d} {'-' if area is None else f'{area:.1f}':>9}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,12 +6,50 @@
 
 module tb ();
   // Dump the signals to a VCD file. You can view it with gtkwave.
+  // Only with +VCD=<path> (make VCD_FILE=tb.vcd), a full dump of every test grows with every cycle.
+  // Without it test.py keeps the last cycles of CPU state in a ring and writes that out when a test fails.
+  // Under verilator use VERILATOR_TRACE=1 instead, it only traces with --trace (cocotb writes dump.vcd)
+`ifndef VERILATOR
+  reg [8*256-1:0] vcd_file;
   initial begin
-     $dumpfile("oogabooga.vcd");
-    $dumpvars(0, tb);
+    if ($value$plusargs("VCD=%s", vcd_file)) begin
+      $dumpfile(vcd_file);
+      $dumpvars(0, tb);
+    end
     #1;
   end
 
+  // Dump controls for WaveformDump in test.py. A rising edge on dump_start opens dump_file (a string
+  // written from Python) and adds the scopes selected in dump_scopes, once per simulation since
+  // $dumpfile/$dumpvars cannot be repeated. dump_on then switches between $dumpon and $dumpoff
+  reg [8*256-1:0] dump_file = 0;
+  reg [7:0] dump_scopes = 8'b0;
+  reg dump_start = 1'b0;
+  reg dump_on = 1'b0;
+
+  always @(posedge dump_start) begin
+    $dumpfile(dump_file);
+    if (dump_scopes[0]) $dumpvars(1, tb);                   // tb ports only
+    if (dump_scopes[1]) $dumpvars(1, tb.user_project);      // top level nets (bus, control signals)
+`ifndef GL_TEST
+    if (dump_scopes[2]) $dumpvars(0, tb.user_project.cb);
+    if (dump_scopes[3]) $dumpvars(0, tb.user_project.alu_object);
+    if (dump_scopes[4]) $dumpvars(0, tb.user_project.accumulator_object);
+    if (dump_scopes[5]) $dumpvars(0, tb.user_project.pc);
+    if (dump_scopes[6]) $dumpvars(0, tb.user_project.ram);
+    if (dump_scopes[7]) $dumpvars(0, tb.user_project.instruction_register);
+`endif
+    if (!dump_on) $dumpoff;
+  end
+
+  always @(dump_on) begin
+    if (dump_start) begin
+      if (dump_on) $dumpon;
+      else $dumpoff;
+    end
+  end
+`endif
+
 //  Wire up the inputs and outputs:
 reg clk;
 reg rst_n;
@@ -20,14 +58,60 @@ reg [7:0] ui_in;
 reg [7:0] uio_in;
 wire [7:0] uo_out;
 wire [7:0] uio_out;
-reg [7:0] uio_oe;
+wire [7:0] uio_oe;
 `ifdef GL_TEST
   wire VPWR = 1'b1;
   wire VGND = 1'b0;
 `endif
 
+  // Optional clock generator: with +HDL_CLOCK_PERIOD=<ns> clk toggles here instead of from cocotb's Clock,
+  // so Python is only woken on the edges a test awaits (make HDL_CLOCK_PERIOD=10, init() skips the Clock)
+  integer hdl_clock_period;
+  initial begin
+    if ($value$plusargs("HDL_CLOCK_PERIOD=%d", hdl_clock_period)) begin
+      clk = 1'b1;                       // cocotb's Clock starts high as well
+      /* verilator lint_off ZERODLY */  // The half period comes from the plusarg, it is never 0
+      forever #(hdl_clock_period / 2.0) clk = ~clk;
+      /* verilator lint_on ZERODLY */
+    end
+  end
+
+`ifndef GL_TEST
+  // Program image preload: +PROGRAM=<file.hex> is loaded into the RAM at time zero, before any clock edge.
+  // +PROGRAM_RELOAD=<file.hex> is the runtime backdoor: it is loaded on every rising edge of load_program,
+  // which the cocotb test pulses after rewriting the file
+  reg [8*256-1:0] program_file;
+  reg [8*256-1:0] program_reload_file;
+  reg load_program = 1'b0;
+  integer program_fd;
+
+  initial begin
+    if ($value$plusargs("PROGRAM=%s", program_file)) begin
+      program_fd = $fopen(program_file, "r");
+      if (program_fd != 0) begin
+        $fclose(program_fd);
+        $readmemh(program_file, user_project.ram.RAM, 0, 15);
+      end else begin
+        $display("tb: +PROGRAM file %0s not found, the RAM starts empty", program_file);
+      end
+    end
+    if (!$value$plusargs("PROGRAM_RELOAD=%s", program_reload_file)) begin
+      program_reload_file = 0;
+    end
+  end
+
+  always @(posedge load_program) begin
+    $readmemh(program_reload_file, user_project.ram.RAM, 0, 15);
+  end
+
+  // For stage_reached() in test.py: stage_hit rises when the control block enters stage_target,
+  // so Python waits on that one edge instead of reading the stage on every clock
+  reg [2:0] stage_target = 3'd0;
+  wire stage_hit = (user_project.cb.stage == stage_target);
+`endif
+
 // Replace tt_um_example with your module name:
-tt_um_example user_project (
+tt_um_ece298a_8_bit_cpu_top user_project (
 // Include power ports for the Gate Level test:
 `ifdef GL_TEST
       .VPWR(VPWR),
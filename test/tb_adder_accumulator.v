@@ -7,11 +7,18 @@
 module tb ();
 
   // Dump the signals to a VCD file. You can view it with gtkwave.
+  // Only with +VCD=<path> (make -f Makefile_adder_accumulator VCD_FILE=tb.vcd), the exhaustive sweep alone is
+  // almost two million cycles. Under verilator use VERILATOR_TRACE=1 instead (cocotb writes dump.vcd)
+`ifndef VERILATOR
+  reg [8*256-1:0] vcd_file;
   initial begin
-    $dumpfile("tb.vcd");
-    $dumpvars(0, tb);
+    if ($value$plusargs("VCD=%s", vcd_file)) begin
+      $dumpfile(vcd_file);
+      $dumpvars(0, tb);
+    end
     #1;
   end
+`endif
 
 //  Wire up the inputs and outputs:
 reg clk;
@@ -27,6 +34,18 @@ reg [7:0] uio_oe;
   wire VGND = 1'b0;
 `endif
 
+  // Optional clock generator: with +HDL_CLOCK_PERIOD=<ns> clk toggles here instead of from cocotb's Clock,
+  // so Python is only woken on the edges a test awaits (make HDL_CLOCK_PERIOD=10, init() skips the Clock)
+  integer hdl_clock_period;
+  initial begin
+    if ($value$plusargs("HDL_CLOCK_PERIOD=%d", hdl_clock_period)) begin
+      clk = 1'b1;                       // cocotb's Clock starts high as well
+      /* verilator lint_off ZERODLY */  // The half period comes from the plusarg, it is never 0
+      forever #(hdl_clock_period / 2.0) clk = ~clk;
+      /* verilator lint_on ZERODLY */
+    end
+  end
+
 // Replace tt_um_example with your module name:
 tt_um_adder_accumulator_sathworld user_project (
 // Include power ports for the Gate Level test:
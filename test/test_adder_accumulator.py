@@ -7,7 +7,14 @@ from cocotb.triggers import ClockCycles, FallingEdge, RisingEdge
 from cocotb.types.logic import Logic
 from cocotb.types.logic_array import LogicArray
 
+import os
+import time
 from random import randint, shuffle
+
+import numpy as np
+
+from functional_coverage import cover_group, write_at_exit
+from sap1_model import alu
 # @cocotb.test()
 # async def test_project(dut):
 #     dut._log.info("Start")
@@ -45,9 +52,32 @@ from random import randint, shuffle
 #     # Keep testing the module by changing the input values, waiting for
 #     # one or more clock cycles, and asserting the expected output values.
 
-CLOCK_PERIOD = 10  # 100 MHz
+# make -f Makefile_adder_accumulator HDL_CLOCK_PERIOD=<ns> has tb_adder_accumulator.v generate the clock
+HDL_CLOCK = "HDL_CLOCK_PERIOD" in cocotb.plusargs
+CLOCK_PERIOD = int(cocotb.plusargs.get("HDL_CLOCK_PERIOD", 10))  # 100 MHz
+# make ADDER_ARCH=<n> selects the adder in add_sub_8bit.v (-DADDER_ARCH), the plusarg tells the tests which one they check
+ADDER_ARCH = int(cocotb.plusargs.get("ADDER_ARCH", 0))
+ADDER_ARCH_NAMES = ("ripple carry", "carry-lookahead", "Kogge-Stone")
 GLTEST = False
 LocalTest = False
+# Verilator is two-state: the undriven bus reads 0 instead of Z
+VERILATOR = cocotb.SIM_NAME is not None and cocotb.SIM_NAME.lower().startswith("verilator")
+
+# Operand buckets around the carry/sign boundaries, OPERAND_BUCKET maps a byte to its bucket
+OPERAND_BUCKETS = ("0x00", "0x01-0x7E", "0x7F", "0x80", "0x81-0xFE", "0xFF")
+OPERAND_BUCKET = bytes(0 if v == 0 else 2 if v == 0x7F else 3 if v == 0x80 else 5 if v == 0xFF else 1 if v < 0x80 else 4 for v in range(256))
+
+def adder_bin(a, b, operation, carry):
+    return (((OPERAND_BUCKET[a] * 6) + OPERAND_BUCKET[b]) * 2 + operation) * 2 + carry
+
+# Bins some operand pair can actually reach, e.g. 0x00 + 0x00 never carries and 0xFF + 0xFF always does
+ADDER_REACHABLE = {adder_bin(a, b, operation, alu(a, b, operation)[1]) for a in range(256) for b in range(256) for operation in (0, 1)}
+
+# A bucket x B bucket x operation x carry out
+ADDER_COVERAGE = cover_group("adder",
+                             [("A", OPERAND_BUCKETS), ("B", OPERAND_BUCKETS), ("operation", ("add", "sub")), ("CF", (0, 1))],
+                             ignore=lambda a, b, operation, cf: ((((a * 6) + b) * 2 + operation) * 2 + cf) not in ADDER_REACHABLE)
+write_at_exit("test_adder_accumulator", cocotb.RANDOM_SEED)
 
 async def bus_values(dut):
     dut._log.info(f"GLTEST={GLTEST}")
@@ -89,9 +119,12 @@ async def determine_gltest(dut):
         assert dut.user_project.bus.value == dut.user_project.bus.value, "Something went terribly wrong"
 
 async def init(dut):
-    dut._log.info("Initialize clock")
-    clock = Clock(dut.clk, CLOCK_PERIOD, units="ns")
-    cocotb.start_soon(clock.start())
+    if HDL_CLOCK:
+        dut._log.info("Clock generated by the testbench")
+    else:
+        dut._log.info("Initialize clock")
+        clock = Clock(dut.clk, CLOCK_PERIOD, units="ns")
+        cocotb.start_soon(clock.start())
     dut._log.info("Reset signals")
     await determine_gltest(dut) # For some unknown reason, determine_gltest sometimes executes after bus_vals, which makes 0 sense
     await bus_values(dut)
@@ -112,7 +145,9 @@ async def init(dut):
     await RisingEdge(dut.clk) 
     await control_signal_values(dut)
     await bus_values(dut)
-    if (not GLTEST):
+    if (VERILATOR):
+        assert (dut.user_project.bus.value == dut.uo_out.value), f"Bus and output differ, bus={dut.user_project.bus.value}, output={dut.uo_out.value}"
+    elif (not GLTEST):
         assert (dut.uo_out.value == "zzzzzzzz") and (dut.user_project.bus.value == dut.uo_out.value), f"""Bus load failed: expected {LogicArray("ZZZZZZZZ")}, got bus={dut.user_project.bus.value}, output={dut.uo_out.value}"""
     else:
         assert (dut.uo_out.value == "zzzzzzzz" or dut.uo_out.value == "xxxxxxxx"), f"""Bus load failed: expected {LogicArray("ZZZZZZZZ")}, got output={dut.uo_out.value}"""
@@ -226,7 +261,7 @@ async def accumulator_test_shuffled_range(dut):
     dut._log.info("Test the accumulator module loading/reading with a shuffled range of 0-255")
     await init(dut)
     
-    test_values = list(range(0,255))
+    test_values = list(range(0,256))
     shuffle(test_values)
     test_values = test_values[:25]
     for test_value in test_values:
@@ -258,18 +293,12 @@ async def check_adder_operation(dut, operation, a, b):
     dut._log.info("Test addition/subtraction operations of the adder module")
     dut._log.info("Calculate expected result based on the operation")
     if operation == 0:
-        expVal = (a + b) 
-        expCF = int((expVal & 0x100) >> 8)
-        expVal = expVal & 0xFF  # 8-bit overflow behavior for addition
         operation_name = "Addition"
     elif operation == 1:
-        expVal = (a + ((b ^ 0xFF) + 1))
-        expCF = (expVal & 0x100) >> 8
-        expVal = expVal & 0xFF  # 8-bit underflow behavior for subtraction
         operation_name = "Subtraction"
     else:
         assert False, f"Unknown operation code: {operation}"
-    expZF = int(expVal == 0)
+    expVal, expCF, expZF = alu(a, b, operation)
     dut._log.info(f"Operation: {operation_name}, regA: {a} {a:#010b}, regB: {b} {b:#010b}")
     dut._log.info(f"Expected result: {expVal}, bin: {expVal:#010b}, ZF: {expZF}, CF: {expCF}") 
     # Wait for result on the bus
@@ -290,6 +319,8 @@ async def check_adder_operation(dut, operation, a, b):
         # assert (read_control_signal_bit(dut.uio_out.value,6) == expCF) and (dut.user_project.CF.value == expCF), f"Carry flag failed: expected {expCF}, got {dut.user_project.CF.value}"
         assert dut.user_project.CF.value == expCF, f"Carry flag failed: expected {expCF}, got {dut.user_project.CF.value}"
         assert (read_control_signal_bit(dut.uio_out.value,7) == expZF) and (dut.user_project.ZF.value == expZF), f"Zero flag failed: expected {expZF}, got {dut.user_project.ZF.value}"
+        # Only a carry that was checked counts (the GL test has no CF to check)
+        ADDER_COVERAGE.hit(adder_bin(a, b, operation, expCF))
     else:
         # assert (read_control_signal_bit(dut.uio_out.value,6) == expCF), f"Carry flag failed: expected {expCF}, got {dut.uo_out.value}"
         assert (read_control_signal_bit(dut.uio_out.value,7) == expZF), f"Zero flag failed: expected {expZF}, got {dut.uo_out.value}"
@@ -305,11 +336,11 @@ async def adder_test_addition_range(dut):
     dut._log.info("Test the adder module adding/subtracting with a shuffled range of 0-255")
     await init(dut)
 
-    test_regA_values = list(range(0,255))
+    test_regA_values = list(range(0,256))
     shuffle(test_regA_values)
     test_regA_values = test_regA_values[:50]
     
-    test_regB_values = list(range(0,255))
+    test_regB_values = list(range(0,256))
     shuffle(test_regB_values)
     test_regB_values = test_regB_values[:50]
     
@@ -332,11 +363,11 @@ async def adder_test_subtraction_range(dut):
     dut._log.info("Test the adder module adding/subtracting with a shuffled range of 0-255")
     await init(dut)
 
-    test_regA_values = list(range(0,255))
+    test_regA_values = list(range(0,256))
     shuffle(test_regA_values)
     test_regA_values = test_regA_values[:50]
     
-    test_regB_values = list(range(0,255))
+    test_regB_values = list(range(0,256))
     shuffle(test_regB_values)
     test_regB_values = test_regB_values[:50]
     
@@ -358,11 +389,11 @@ async def adder_test_addsub_range(dut):
     dut._log.info("Test the adder module adding/subtracting with a shuffled range of 0-255")
     await init(dut)
 
-    test_regA_values = list(range(0,255))
+    test_regA_values = list(range(0,256))
     shuffle(test_regA_values)
     test_regA_values = test_regA_values[:50]
     
-    test_regB_values = list(range(0,255))
+    test_regB_values = list(range(0,256))
     shuffle(test_regB_values)
     test_regB_values = test_regB_values[:50]
     
@@ -377,4 +408,105 @@ async def adder_test_addsub_range(dut):
             await regAB_load_helper(dut, 'b', regB_val)
             dut.uio_in.value = setbit(dut.uio_in.value, 5, operation)
             await check_adder_operation(dut, operation, regA_val, regB_val)            
+    dut._log.info(f"Coverage so far, {ADDER_COVERAGE.summary()}")
     dut._log.info("Adder module test completed successfully.")
+
+# Expected ALU outputs for every (sub, A, B), index = (sub << 16) | (A << 8) | B
+SWEEP_A = np.tile(np.repeat(np.arange(256, dtype=np.int32), 256), 2)
+SWEEP_B = np.tile(np.arange(256, dtype=np.int32), 512)
+SWEEP_SUB = np.repeat(np.arange(2, dtype=np.int32), 65536)
+SWEEP_TOTAL = SWEEP_A + np.where(SWEEP_SUB == 1, (SWEEP_B ^ 0xFF) + 1, SWEEP_B)
+SWEEP_SUM = (SWEEP_TOTAL & 0xFF).astype(np.int16)
+SWEEP_CARRY = (SWEEP_TOTAL >> 8).astype(np.int16)
+
+# uio_in words for the sweep (bit n = uio_in[n]), loading_onto_bus is held high so ui_in_buf feeds the bus every clock
+SWEEP_IDLE = 0b01100010         # nLa=1, nLb=1, loading_onto_bus=1
+SWEEP_LOAD_A = 0b00100010       # nLa=0
+SWEEP_LOAD_B = 0b01000010       # nLb=0
+SWEEP_ALU_OUT = 0b11101000      # Eu=1, loading_onto_bus=0, bus_regA_sel=1: the adder drives the bus and uo_out, the flags register
+
+def sample_int(handle):
+    value = handle.value
+    return value.integer if value.is_resolvable else -1
+
+async def sweep_row(dut, a, sub, observed_sum, observed_carry, observed_zero, observed_outputs):
+    # One (A, sub) row: A is loaded once, then a new B goes into ui_in every clock. B reaches the bus through
+    # ui_in_buf one clock later and regB the clock after that, so the adder output for the B driven in
+    # iteration n is sampled at the edge that ends iteration n + 3 while later B values are already in flight.
+    # Results are read from the internal adder (sum/carry_out/res_zero), the bus stays with ui_in_buf.
+    # The last vector (B=0xFF) then goes through the outputs: the adder drives the bus and uo_out for one clock,
+    # which registers CF/ZF, and bus, uo_out, CF, ZF and the ZF pin (uio_out[0]) go into observed_outputs[(sub << 8) | a]
+    user_project = dut.user_project
+    alu_sum = user_project.aluobj.sum
+    alu_carry = user_project.aluobj.carry_out
+    alu_zero = user_project.aluobj.res_zero
+    sub_bit = sub << 2
+    base = (sub << 16) | (a << 8)
+    edge = RisingEdge(dut.clk)
+    for n in range(259):
+        if n == 0:
+            dut.ui_in.value = a
+            dut.uio_in.value = SWEEP_IDLE | sub_bit
+        elif n == 1:
+            dut.uio_in.value = SWEEP_LOAD_A | sub_bit      # bus = ui_in_buf = A
+        elif n == 2:
+            dut.uio_in.value = SWEEP_LOAD_B | sub_bit      # bus = B[0], stays in this mode for the rest of the row
+        if 1 <= n <= 256:
+            dut.ui_in.value = n - 1
+        await edge
+        b = n - 3
+        if b >= 0:
+            sum_value = alu_sum.value
+            carry_value = alu_carry.value
+            zero_value = alu_zero.value
+            observed_sum[base | b] = sum_value.integer if sum_value.is_resolvable else -1
+            observed_carry[base | b] = carry_value.integer if carry_value.is_resolvable else -1
+            observed_zero[base | b] = zero_value.integer if zero_value.is_resolvable else -1
+    dut.uio_in.value = SWEEP_ALU_OUT | sub_bit
+    await edge
+    await FallingEdge(dut.clk)
+    observed_outputs[(sub << 8) | a] = (sample_int(user_project.bus), sample_int(dut.uo_out), sample_int(user_project.CF),
+                                        sample_int(user_project.ZF), sample_int(dut.uio_out) & 1)
+
+# Needs the internal adder nets, so it only runs on RTL (skipped with make GATES=yes)
+@cocotb.test(skip=os.environ.get("GATES") == "yes")
+async def adder_test_exhaustive_sweep(dut):
+    # All 131,072 (A, B, sub) combinations, one vector per clock, compared against the NumPy tables in one go at the end
+    dut._log.info(f"Test the {ADDER_ARCH_NAMES[ADDER_ARCH]} adder (ADDER_ARCH={ADDER_ARCH}) with every A, B and operation, streaming one vector per clock")
+    await init(dut)
+    assert not GLTEST, "The exhaustive sweep reads the internal adder nets, run the GL test with make GATES=yes"
+    observed_sum = np.full(131072, -1, dtype=np.int16)
+    observed_carry = np.full(131072, -1, dtype=np.int16)
+    observed_zero = np.full(131072, -1, dtype=np.int16)
+    observed_outputs = np.full((512, 5), -1, dtype=np.int16)
+    start = time.perf_counter()
+    for sub in (0, 1):
+        for a in range(256):
+            await sweep_row(dut, a, sub, observed_sum, observed_carry, observed_zero, observed_outputs)
+    elapsed = time.perf_counter() - start
+    dut.uio_in.value = SWEEP_IDLE
+    dut._log.info(f"131072 vectors in {elapsed:.1f} s ({131072 / elapsed:.0f} vectors/s)")
+
+    expected_zero = (SWEEP_SUM == 0).astype(np.int16)
+    bad = np.nonzero((observed_sum != SWEEP_SUM) | (observed_carry != SWEEP_CARRY) | (observed_zero != expected_zero))[0]
+    for index in bad[:10]:
+        dut._log.error(f"{'SUB' if SWEEP_SUB[index] else 'ADD'} A={SWEEP_A[index]} B={SWEEP_B[index]}: "
+                       f"sum={observed_sum[index]} carry={observed_carry[index]} zero={observed_zero[index]}, "
+                       f"expected sum={SWEEP_SUM[index]} carry={SWEEP_CARRY[index]} zero={expected_zero[index]}")
+    # Per row, (bus, uo_out, CF, ZF, ZF pin) for B=0xFF
+    last = np.arange(512) << 8 | 0xFF
+    expected_outputs = np.stack([SWEEP_SUM[last], SWEEP_SUM[last], SWEEP_CARRY[last], expected_zero[last], expected_zero[last]], axis=1)
+    bad_rows = np.nonzero((observed_outputs != expected_outputs).any(axis=1))[0]
+    for row in bad_rows[:10]:
+        dut._log.error(f"{'SUB' if row >> 8 else 'ADD'} A={row & 0xFF} B=255 at the outputs: (bus, uo_out, CF, ZF, uio_out[0])="
+                       f"{tuple(observed_outputs[row].tolist())}, expected {tuple(expected_outputs[row].tolist())}")
+    # Coverage from the observed carries of the vectors that matched
+    good = np.ones(131072, dtype=bool)
+    good[bad] = False
+    bucket = np.frombuffer(OPERAND_BUCKET, dtype=np.uint8).astype(np.int32)
+    for index in np.unique(((bucket[SWEEP_A[good]] * 6 + bucket[SWEEP_B[good]]) * 2 + SWEEP_SUB[good]) * 2 + observed_carry[good]):
+        ADDER_COVERAGE.hit(int(index))
+    dut._log.info(f"Coverage so far, {ADDER_COVERAGE.summary()}")
+    assert len(bad) == 0, f"{len(bad)} of 131072 adder vectors are wrong"
+    assert len(bad_rows) == 0, f"{len(bad_rows)} of 512 rows are wrong at the bus, uo_out or the registered flags"
+    dut._log.info(f"Adder exhaustive sweep completed successfully, {ADDER_ARCH_NAMES[ADDER_ARCH]} adder matches the reference.")